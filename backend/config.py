@@ -94,6 +94,7 @@ def build_workers() -> list[dict]:
                 "last_heartbeat": None,
                 "consecutive_failures": 0,
                 "avg_task_duration_ms": 0,
+                "avg_task_duration_ms_f": 0.0,
             },
         })
     return workers
@@ -0,0 +1,18 @@
+"""Shared pytest fixtures for backend tests."""
+import os
+import sys
+
+import pytest
+
+# Ensure backend modules are importable
+_here = os.path.dirname(os.path.abspath(__file__))
+if _here not in sys.path:
+    sys.path.insert(0, _here)
+
+
+@pytest.fixture(scope="session")
+def main_mod():
+    """Import the FastAPI app module once per test session."""
+    import main
+
+    return main
@@ -30,7 +30,8 @@ class DispatchRuntime:
         engine_health: dict[str, bool],
         runtime_executions: dict[str, asyncio.Task],
         route_task: Callable[[dict], str],
-        dependencies_satisfied: Callable[[dict, dict], bool],
+        dependencies_satisfied: Callable[[dict, dict, dict | None], bool],
+        index_tasks: Callable[[dict], dict[str, dict]],
         ensure_task_shape: Callable[[dict], None],
         append_attempt: Callable[[dict, str, str], None],
         add_timeline: Callable[[dict, str, dict | None], None],
@@ -59,6 +60,7 @@ class DispatchRuntime:
         self.runtime_executions = runtime_executions
         self.route_task = route_task
         self.dependencies_satisfied = dependencies_satisfied
+        self.index_tasks = index_tasks
         self.ensure_task_shape = ensure_task_shape
         self.append_attempt = append_attempt
         self.add_timeline = add_timeline
@@ -128,13 +130,15 @@ class DispatchRuntime:
 
         now = datetime.now(timezone.utc)
         pending: list[dict] = []
+        # Shared by every dependency check in this pass
+        idx = self.index_tasks(data)
         for task in data.get("tasks", []):
             self.ensure_task_shape(task)
             if task.get("status") != "pending":
                 continue
             if task.get("assigned_worker"):
                 continue
-            if not self.dependencies_satisfied(task, data):
+            if not self.dependencies_satisfied(task, data, idx):
                 continue
             # Skip tasks in retry delay window
             retry_after = task.get("retry_after")
@@ -175,9 +179,10 @@ class DispatchRuntime:
                 continue
 
             lease_id = f"lease-{uuid.uuid4().hex[:12]}"
+            now_iso = self.now_iso()
             task["status"] = "in_progress"
             task["assigned_worker"] = worker["id"]
-            task["started_at"] = task.get("started_at") or self.now_iso()
+            task["started_at"] = task.get("started_at") or now_iso
             task["blocked_reason"] = None
             self.add_timeline(task, "task_dispatched", {"worker_id": worker["id"], "lease_id": lease_id})
             self.append_attempt(task, worker["id"], lease_id)
@@ -185,10 +190,10 @@ class DispatchRuntime:
             worker["status"] = "busy"
             worker["current_task_id"] = task["id"]
             worker["current_project_id"] = project_id
-            worker["started_at"] = self.now_iso()
+            worker["started_at"] = now_iso
             worker["lease_id"] = lease_id
-            worker["last_seen_at"] = self.now_iso()
-            worker["health"]["last_heartbeat"] = self.now_iso()
+            worker["last_seen_at"] = now_iso
+            worker["health"]["last_heartbeat"] = now_iso
 
             dispatch_event = self.emit_event(
                 data,
@@ -18,6 +18,7 @@ import re
 import shutil
 import subprocess
 import uuid
+from collections import Counter, deque
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
@@ -26,6 +27,7 @@ from typing import Any, Optional
 from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from filelock import FileLock
+import orjson
 
 from config import (
     ALLOWED_ORIGINS,
@@ -65,10 +67,12 @@ from models import (
     FailRequest,
     HeartbeatRequest,
     PlanApproval,
+    PlanQuestionListAdapter,
     ProjectCreate,
     ProjectUpdate,
     ReviewResult,
     SubTaskInput,
+    SubTaskListAdapter,
     TaskCreate,
     TaskUpdate,
     WorkerUpdate,
@@ -106,8 +110,9 @@ DISPATCH_STATS: dict[str, Any] = {
     "cycle_count": 0,
 }
 
-# Worker log buffer for real-time streaming (worker_id -> list of log lines)
-WORKER_LOGS: dict[str, list[dict]] = {}
+# Worker log buffer for real-time streaming (worker_id -> bounded deque of log lines)
+WORKER_LOG_MAX_LINES = 200
+WORKER_LOGS: dict[str, deque[dict]] = {}
 
 WORKER_RUNNER = WorkerRunner(
     claude_cli=CLAUDE_CLI,
@@ -119,31 +124,32 @@ WORKER_RUNNER = WorkerRunner(
 # --- WebSocket connection manager ---
 class ConnectionManager:
     def __init__(self):
-        self.active: list[WebSocket] = []
+        # Insertion-ordered set: O(1) removal on disconnect/send failure
+        self.active: dict[WebSocket, None] = {}
 
     async def connect(self, ws: WebSocket):
         await ws.accept()
-        self.active.append(ws)
+        self.active[ws] = None
 
     def disconnect(self, ws: WebSocket):
-        if ws in self.active:
-            self.active.remove(ws)
+        self.active.pop(ws, None)
 
     async def broadcast(self, message: dict):
-        for ws in list(self.active):
+        # Snapshot first: connect/disconnect may run while we await each send
+        for ws in tuple(self.active):
             try:
                 await ws.send_json(message)
             except Exception:
-                if ws in self.active:
-                    self.active.remove(ws)
+                self.active.pop(ws, None)
 
 
 ws_manager = ConnectionManager()
 
 
 # --- Helpers ---
-def _now() -> str:
-    return datetime.now(timezone.utc).isoformat()
+def _now(_datetime_now=datetime.now, _utc=timezone.utc) -> str:
+    # Hot helper: bind the callable and tz as defaults to skip global/attribute lookups
+    return _datetime_now(_utc).isoformat()
 
 
 def _safe_iso(dt: Optional[str]) -> Optional[datetime]:
@@ -213,15 +219,18 @@ def write_tasks(data: dict, project_id: str | None = None):
         lf = LOCK_FILE
 
     tasks = data.get("tasks", [])
-    completed = sum(1 for x in tasks if x.get("status") == "completed")
-    failed = sum(1 for x in tasks if x.get("status") == "failed")
+    # Counter's C counting loop beats a shared Python loop even with two passes
+    statuses = Counter(t.get("status") for t in tasks)
+    engines = Counter(t.get("routed_engine") for t in tasks)
+    completed = statuses["completed"]
+    failed = statuses["failed"]
 
     data.setdefault("meta", {})
     data["meta"]["last_updated"] = _now()
     data["meta"]["total_completed"] = completed
     data["meta"]["success_rate"] = round(completed / max(completed + failed, 1), 2)
-    data["meta"]["claude_tasks"] = sum(1 for t in tasks if t.get("routed_engine") == "claude")
-    data["meta"]["codex_tasks"] = sum(1 for t in tasks if t.get("routed_engine") == "codex")
+    data["meta"]["claude_tasks"] = engines["claude"]
+    data["meta"]["codex_tasks"] = engines["codex"]
     data["schema_version"] = 2
 
     lock = FileLock(str(lf))
@@ -314,6 +323,7 @@ def _migrate_to_projects():
         _init_project_tasks(default_id)
 
     # Create projects registry
+    now = _now()
     projects_data = {
         "schema_version": 1,
         "projects": [
@@ -323,8 +333,8 @@ def _migrate_to_projects():
                 "description": "从原始数据自动迁移",
                 "repo_path": str(_repo_root()),
                 "status": "active",
-                "created_at": _now(),
-                "updated_at": _now(),
+                "created_at": now,
+                "updated_at": now,
                 "completed_at": None,
                 "archived_at": None,
             }
@@ -388,11 +398,22 @@ def find_task(data: dict, task_id: str) -> Optional[dict]:
     return None
 
 
-def dependencies_satisfied(task: dict, data: dict) -> bool:
+def index_tasks(data: dict) -> dict[str, dict]:
+    """Map task id -> task for repeated lookups (first occurrence wins, like find_task)."""
+    return {task.get("id"): task for task in reversed(data.get("tasks", []))}
+
+
+def _missing_dependencies(data: dict, depends_on: list[str]) -> list[str]:
+    """Return depends_on ids with no matching task, in their original order."""
+    all_ids = {task.get("id") for task in data.get("tasks", [])}
+    return [dep_id for dep_id in depends_on if dep_id not in all_ids]
+
+
+def dependencies_satisfied(task: dict, data: dict, idx: Optional[dict[str, dict]] = None) -> bool:
     # Review tasks can start once the source task reaches "reviewing" status
     is_review = task.get("task_type") == "review"
     for dep in task.get("depends_on", []) or []:
-        dep_task = find_task(data, dep)
+        dep_task = idx.get(dep) if idx is not None else find_task(data, dep)
         if not dep_task:
             return False
         dep_status = dep_task.get("status")
@@ -405,10 +426,10 @@ def dependencies_satisfied(task: dict, data: dict) -> bool:
     return True
 
 
-def add_timeline(task: dict, event: str, detail: Optional[dict] = None):
+def add_timeline(task: dict, event: str, detail: Optional[dict] = None, at: Optional[str] = None):
     task.setdefault("timeline", [])
     task["timeline"].append({
-        "at": _now(),
+        "at": at or _now(),
         "event": event,
         "detail": detail or {},
     })
@@ -515,6 +536,10 @@ async def _maybe_push(title: str, body: str, data: Optional[dict] = None) -> Non
         logger.debug("Push notification skipped", exc_info=True)
 
 
+# Fenced ```json ... ``` block in CLI output; compiled once, shared by the parsers below
+_JSON_FENCE_RE = re.compile(r"```json\s*\n?(.*?)\n?\s*```", re.DOTALL)
+
+
 def _parse_review_json(text: str) -> tuple[list[dict] | None, str]:
     """Extract structured review JSON from worker stdout.
 
@@ -524,13 +549,12 @@ def _parse_review_json(text: str) -> tuple[list[dict] | None, str]:
     Returns (None, "") when the output cannot be parsed — callers must
     treat this as an indeterminate review (not an auto-approval).
     """
-    pattern = r"```json\s*\n?(.*?)\n?\s*```"
-    matches = re.findall(pattern, text, re.DOTALL)
+    matches = _JSON_FENCE_RE.findall(text)
     if not matches:
         logger.warning("Review output missing JSON block; cannot parse review result")
         return None, ""
     try:
-        obj = json.loads(matches[-1])  # Take the LAST json block
+        obj = orjson.loads(matches[-1])  # Take the LAST json block
         issues = obj.get("issues", [])
         summary = obj.get("summary", "")
         return issues, summary
@@ -625,6 +649,33 @@ def _handle_review_completion(
     _apply_review_to_parent(issues, review_summary, parent)
 
 
+# Reviews run on the other engine; anything that is not claude is reviewed by claude
+_OPPOSITE_ENGINE = {"claude": "codex", "codex": "claude"}
+
+# Constant-valued fields of an auto-created review task. Mutable fields (lists)
+# are filled in per task so instances never share state.
+_REVIEW_TASK_TEMPLATE: dict = {
+    "status": "pending",
+    "task_type": "review",
+    "engine": "auto",
+    "plan_mode": False,
+    "plan_content": None,
+    "assigned_worker": None,
+    "worktree_branch": None,
+    "review_status": None,
+    "review_result": None,
+    "started_at": None,
+    "completed_at": None,
+    "error_log": None,
+    "retry_count": 0,
+    "max_retries": 3,
+    "blocked_reason": None,
+    "fallback_reason": None,
+    "review_round": 0,
+    "last_exit_code": None,
+}
+
+
 def maybe_trigger_adversarial_review(task: dict, data: dict) -> Optional[dict]:
     if task.get("task_type") not in {"feature", "bugfix", "refactor"}:
         return None
@@ -640,45 +691,29 @@ def maybe_trigger_adversarial_review(task: dict, data: dict) -> Optional[dict]:
     if existing:
         return None
 
-    review_engine = "codex" if (task.get("routed_engine") or task.get("engine")) == "claude" else "claude"
-    review_task = {
-        "id": gen_task_id(data),
-        "title": f"Review: {task['title']}",
-        "description": f"对任务 {task['id']} 的代码做对抗式 Review",
-        "status": "pending",
-        "priority": task.get("priority", "medium"),
-        "task_type": "review",
-        "engine": "auto",
-        "routed_engine": review_engine,
-        "parent_task_id": task["id"],
-        "sub_tasks": [],
-        "depends_on": [task["id"]],
-        "plan_mode": False,
-        "plan_content": None,
-        "plan_questions": [],
-        "assigned_worker": None,
-        "worktree_branch": None,
-        "review_status": None,
-        "review_engine": review_engine,
-        "review_result": None,
-        "created_at": _now(),
-        "started_at": None,
-        "completed_at": None,
-        "commit_ids": [],
-        "error_log": None,
-        "retry_count": 0,
-        "max_retries": 3,
-        "attempts": [],
-        "timeline": [],
-        "blocked_reason": None,
-        "fallback_reason": None,
-        "review_round": 0,
-        "last_exit_code": None,
-    }
-    add_timeline(review_task, "task_created", {"auto": True, "source": "adversarial_review"})
+    review_engine = _OPPOSITE_ENGINE.get(task.get("routed_engine") or task.get("engine"), "claude")
+    now = _now()
+    review_task = dict(
+        _REVIEW_TASK_TEMPLATE,
+        id=gen_task_id(data),
+        title=f"Review: {task['title']}",
+        description=f"对任务 {task['id']} 的代码做对抗式 Review",
+        priority=task.get("priority", "medium"),
+        routed_engine=review_engine,
+        parent_task_id=task["id"],
+        sub_tasks=[],
+        depends_on=[task["id"]],
+        plan_questions=[],
+        review_engine=review_engine,
+        created_at=now,
+        commit_ids=[],
+        attempts=[],
+        timeline=[],
+    )
+    add_timeline(review_task, "task_created", {"auto": True, "source": "adversarial_review"}, at=now)
     task["review_status"] = "pending"
     task["status"] = "reviewing"
-    add_timeline(task, "review_requested", {"review_task_id": review_task["id"]})
+    add_timeline(task, "review_requested", {"review_task_id": review_task["id"]}, at=now)
     data["tasks"].insert(0, review_task)
     return review_task
 
@@ -696,40 +731,39 @@ def _decompose_from_plan(task: dict) -> list[SubTaskInput]:
     if not candidates:
         candidates = [task["title"]]
 
-    subtasks: list[SubTaskInput] = []
-    for idx, line in enumerate(candidates[:8], start=1):
-        text = line
+    priority = task.get("priority", "medium")
+    payload: list[dict] = []
+    for idx, text in enumerate(candidates[:8], start=1):
         ttype = classify_task_type(text, text)
-        priority = task.get("priority", "medium")
-        engine = "auto"
-        subtasks.append(
-            SubTaskInput(
-                title=f"{task['title']} - 子任务 {idx}: {text[:80]}",
-                description=text,
-                task_type=ttype if ttype in TASK_TYPES else "feature",
-                engine=engine,
-                priority=priority,
-            )
-        )
-    return subtasks
+        payload.append({
+            "title": f"{task['title']} - 子任务 {idx}: {text[:80]}",
+            "description": text,
+            "task_type": ttype if ttype in TASK_TYPES else "feature",
+            "engine": "auto",
+            "priority": priority,
+        })
+    return SubTaskListAdapter.validate_python(payload)
 
 
-def _all_subtasks_completed(parent: dict, data: dict) -> bool:
+def _all_subtasks_completed(parent: dict, data: dict, idx: Optional[dict[str, dict]] = None) -> bool:
     sub_ids = parent.get("sub_tasks", [])
     if not sub_ids:
         return False
     for sid in sub_ids:
-        sub = find_task(data, sid)
+        sub = idx.get(sid) if idx is not None else find_task(data, sid)
         if not sub or sub.get("status") != "completed":
             return False
     return True
 
 
 def _refresh_parent_rollup(data: dict):
+    idx: Optional[dict[str, dict]] = None
     for task in data.get("tasks", []):
         if task.get("status") != "blocked_by_subtasks":
             continue
-        if not _all_subtasks_completed(task, data):
+        if idx is None:
+            idx = index_tasks(data)
+        if not _all_subtasks_completed(task, data, idx):
             continue
 
         # parent roll-up completion
@@ -756,7 +790,25 @@ def _update_worker_cli_health():
 WORKTREE_DIR = _repo_root() / ".worktrees"
 
 
-def _ensure_worktree(worker: dict, repo_path: str | None = None) -> str:
+async def _run_git(args: list[str], cwd: str, timeout: float) -> tuple[int, bytes]:
+    """Run a git command without blocking the event loop. Returns (returncode, stderr)."""
+    proc = await asyncio.create_subprocess_exec(
+        "git", *args,
+        cwd=cwd,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        _, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+    finally:
+        # Timeout or cancellation (e.g. lifespan shutdown): don't leave git running
+        if proc.returncode is None:
+            proc.kill()
+            await asyncio.shield(proc.wait())
+    return proc.returncode, stderr or b""
+
+
+async def _aensure_worktree(worker: dict, repo_path: str | None = None) -> str:
     """Create or validate a worktree for the given worker. Returns worktree path."""
     if repo_path:
         repo = Path(repo_path)
@@ -772,32 +824,26 @@ def _ensure_worktree(worker: dict, repo_path: str | None = None) -> str:
         worker["worktree_path"] = str(wt_path)
         return str(wt_path)
 
+    cwd = str(repo)
     try:
         wt_path.parent.mkdir(parents=True, exist_ok=True)
-        subprocess.run(
-            ["git", "worktree", "prune"],
-            cwd=str(repo), capture_output=True, timeout=10,
-        )
-        branch_check = subprocess.run(
-            ["git", "rev-parse", "--verify", branch_name],
-            cwd=str(repo), capture_output=True, timeout=10,
-        )
-        if branch_check.returncode == 0:
-            subprocess.run(
-                ["git", "worktree", "add", str(wt_path), branch_name],
-                cwd=str(repo), capture_output=True, check=True, timeout=30,
-            )
+        branch_rc, _ = await _run_git(["rev-parse", "--verify", branch_name], cwd, timeout=10)
+        if branch_rc == 0:
+            add_args = ["worktree", "add", str(wt_path), branch_name]
         else:
-            subprocess.run(
-                ["git", "worktree", "add", "-b", branch_name, str(wt_path)],
-                cwd=str(repo), capture_output=True, check=True, timeout=30,
-            )
+            add_args = ["worktree", "add", "-b", branch_name, str(wt_path)]
+        add_rc, add_err = await _run_git(add_args, cwd, timeout=30)
+        if add_rc != 0:
+            # A stale registration (e.g. a manually deleted worktree dir) blocks the add;
+            # prune only on this recovery path and retry once
+            await _run_git(["worktree", "prune"], cwd, timeout=10)
+            add_rc, add_err = await _run_git(add_args, cwd, timeout=30)
+        if add_rc != 0:
+            logger.warning("Failed to create worktree for %s: %s", worker["id"], add_err)
+            worker["worktree_path"] = str(repo)
+            return str(repo)
         logger.info("Worktree created for %s at %s", worker["id"], wt_path)
-    except subprocess.CalledProcessError as e:
-        logger.warning("Failed to create worktree for %s: %s", worker["id"], e.stderr)
-        worker["worktree_path"] = str(repo)
-        return str(repo)
-    except (subprocess.SubprocessError, OSError) as exc:
+    except (asyncio.TimeoutError, OSError) as exc:
         logger.warning("Failed to create worktree for %s: %s", worker["id"], exc)
         worker["worktree_path"] = str(repo)
         return str(repo)
@@ -814,8 +860,8 @@ async def _prepare_worktree_for_task(worker: dict, task_id: str, project_id: str
         proj = _find_project(pdata, project_id)
         if proj and proj.get("repo_path"):
             try:
-                _ensure_worktree(worker, proj["repo_path"])
-            except (subprocess.SubprocessError, OSError) as exc:
+                await _aensure_worktree(worker, proj["repo_path"])
+            except OSError as exc:
                 logger.warning("Failed to ensure project worktree for %s: %s", worker["id"], exc)
 
     wt_path = worker.get("worktree_path") or str(_repo_root())
@@ -909,21 +955,21 @@ async def _merge_task_branch(task_id: str, repo_path: str | None = None) -> tupl
         return False, str(exc)
 
 
-def _on_worker_log(worker_id: str, task_id: str, line: str):
-    """Buffer and broadcast a worker log line."""
-    entry = {"at": _now(), "line": line}
-    buf = WORKER_LOGS.setdefault(worker_id, [])
-    buf.append(entry)
-    # Keep only last 200 lines
-    if len(buf) > 200:
-        WORKER_LOGS[worker_id] = buf[-200:]
-    # Broadcast via WebSocket (fire-and-forget)
+def _on_worker_log(worker_id: str, task_id: str, chunk: str):
+    """Buffer and broadcast a batch of newline-joined worker log lines."""
+    at = _now()
+    buf = WORKER_LOGS.get(worker_id)
+    if buf is None:
+        buf = WORKER_LOGS[worker_id] = deque(maxlen=WORKER_LOG_MAX_LINES)
+    # oldest lines fall off automatically
+    buf.extend({"at": at, "line": line} for line in chunk.split("\n"))
+    # Broadcast via WebSocket (fire-and-forget), one message per batch
     asyncio.ensure_future(ws_manager.broadcast({
         "type": "worker_log",
         "worker_id": worker_id,
         "task_id": task_id,
-        "line": line,
-        "at": entry["at"],
+        "line": chunk,
+        "at": at,
     }))
 
 
@@ -933,12 +979,23 @@ def _release_worker(worker: dict):
     worker["current_task_id"] = None
     worker["started_at"] = None
     worker["lease_id"] = None
-    worker["last_seen_at"] = _now()
-    worker["health"]["last_heartbeat"] = _now()
+    now = _now()
+    worker["last_seen_at"] = now
+    worker["health"]["last_heartbeat"] = now
     RUNTIME_EXECUTIONS.pop(worker["id"], None)
     WORKER_LOGS.pop(worker["id"], None)
 
 
+def _plan_cwd(project_id: str | None) -> str:
+    """Directory plan generation runs in: the project repo_path if available."""
+    if project_id:
+        pdata = read_projects()
+        proj = _find_project(pdata, project_id)
+        if proj and proj.get("repo_path"):
+            return proj["repo_path"]
+    return str(_repo_root())
+
+
 async def _run_plan_generation(task_id: str, project_id: str | None = None) -> None:
     """Background coroutine: run Claude in read-only mode to generate plan_content."""
     data = read_tasks(project_id)
@@ -946,13 +1003,7 @@ async def _run_plan_generation(task_id: str, project_id: str | None = None) -> N
     if not task or task.get("status") != "plan_review":
         return
 
-    # Use project repo_path if available
-    cwd = str(_repo_root())
-    if project_id:
-        pdata = read_projects()
-        proj = _find_project(pdata, project_id)
-        if proj and proj.get("repo_path"):
-            cwd = proj["repo_path"]
+    cwd = _plan_cwd(project_id)
 
     async def _on_plan_complete(plan_text: str) -> None:
         d = read_tasks(project_id)
@@ -1024,7 +1075,10 @@ async def _run_worker_task(worker: dict, task_id: str, project_id: str | None =
     async def _on_complete(commit_ids: list[str], summary: Optional[str]):
         # Try to merge task branch back to main
         merge_ok, merge_msg = await _merge_task_branch(task_id, repo_path)
-        if not merge_ok:
+        if merge_ok:
+            # Cached plans were generated against the pre-merge tree
+            WORKER_RUNNER.clear_plan_cache()
+        else:
             logger.warning("Auto-merge failed for %s: %s", task_id, merge_msg)
             # Still complete the task, but record merge issue
             d = read_tasks(project_id)
@@ -1055,7 +1109,7 @@ async def _run_worker_task(worker: dict, task_id: str, project_id: str | None =
         )
 
     # Initialize worker log buffer
-    WORKER_LOGS[worker["id"]] = []
+    WORKER_LOGS[worker["id"]] = deque(maxlen=WORKER_LOG_MAX_LINES)
 
     await WORKER_RUNNER.run_task(
         worker=worker,
@@ -1064,7 +1118,7 @@ async def _run_worker_task(worker: dict, task_id: str, project_id: str | None =
         on_complete=_on_complete,
         on_fail=_on_fail,
         on_release=lambda: _release_worker(worker),
-        on_log=lambda line: _on_worker_log(worker["id"], task_id, line),
+        on_log=lambda chunk: _on_worker_log(worker["id"], task_id, chunk),
     )
 
 
@@ -1103,11 +1157,12 @@ async def _complete_task_internal(task_id: str, *, worker_id: str, lease_id: Opt
         existing.add(cid)
     task["commit_ids"] = list(existing)
     task["status"] = "completed"
-    task["completed_at"] = _now()
+    now = _now()
+    task["completed_at"] = now
     task["error_log"] = None
     task["last_exit_code"] = 0
     task.pop("_review_feedback", None)  # Clean up consumed review feedback
-    add_timeline(task, "task_completed", {"worker_id": worker_id, "summary": summary or ""})
+    add_timeline(task, "task_completed", {"worker_id": worker_id, "summary": summary or ""}, at=now)
     _complete_attempt(task, True, exit_code=0, error_log=None, commit_ids=commit_ids)
 
     worker["total_tasks_completed"] += 1
@@ -1275,8 +1330,8 @@ async def lifespan(app: FastAPI):
     # Initialize git worktrees for each worker (default repo)
     for worker in WORKERS:
         try:
-            _ensure_worktree(worker)
-        except (subprocess.SubprocessError, OSError) as exc:
+            await _aensure_worktree(worker)
+        except OSError as exc:
             logger.warning("Failed to init worktree for %s: %s", worker["id"], exc)
 
     # Initialize worktrees for registered project repositories
@@ -1287,8 +1342,8 @@ async def lifespan(app: FastAPI):
             if rp and Path(rp).is_dir():
                 for worker in WORKERS:
                     try:
-                        _ensure_worktree(worker, rp)
-                    except (subprocess.SubprocessError, OSError) as exc:
+                        await _aensure_worktree(worker, rp)
+                    except OSError as exc:
                         logger.warning("Failed to init worktree for %s in project %s: %s",
                                        worker["id"], proj["id"], exc)
     except Exception as exc:
@@ -1303,6 +1358,7 @@ async def lifespan(app: FastAPI):
         runtime_executions=RUNTIME_EXECUTIONS,
         route_task=route_task,
         dependencies_satisfied=dependencies_satisfied,
+        index_tasks=index_tasks,
         ensure_task_shape=_ensure_task_shape,
         append_attempt=_append_attempt,
         add_timeline=add_timeline,
@@ -1391,9 +1447,9 @@ async def create_task(body: TaskCreate):
 
     # Validate depends_on references
     if body.depends_on:
-        for dep_id in body.depends_on:
-            if not find_task(data, dep_id):
-                raise HTTPException(status_code=400, detail=f"Dependency task not found: {dep_id}")
+        missing = _missing_dependencies(data, body.depends_on)
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Dependency task not found: {missing[0]}")
 
     task_id = gen_task_id(data)
 
@@ -1415,7 +1471,7 @@ async def create_task(body: TaskCreate):
         "depends_on": body.depends_on,
         "plan_mode": body.plan_mode,
         "plan_content": None,
-        "plan_questions": [q.model_dump() for q in body.plan_questions],
+        "plan_questions": PlanQuestionListAdapter.dump_python(body.plan_questions),
         "risk_level": body.risk_level,
         "sla_tier": body.sla_tier,
         "acceptance_criteria": body.acceptance_criteria,
@@ -1484,12 +1540,13 @@ async def update_task(task_id: str, body: TaskUpdate):
 
     if "status" in updates:
         new_status = updates["status"]
+        now = _now()
         if new_status == "in_progress":
             if not dependencies_satisfied(task, data):
                 raise HTTPException(status_code=409, detail="Dependencies not completed")
-            task["started_at"] = task.get("started_at") or _now()
+            task["started_at"] = task.get("started_at") or now
         elif new_status == "completed":
-            task["completed_at"] = _now()
+            task["completed_at"] = now
         elif new_status == "failed":
             task["retry_count"] = min(task.get("retry_count", 0) + 1, task.get("max_retries", 3))
         elif new_status == "pending" and task.get("status") == "failed":
@@ -1497,7 +1554,7 @@ async def update_task(task_id: str, body: TaskUpdate):
             task["error_log"] = None
 
         task["status"] = new_status
-        add_timeline(task, "status_updated", {"status": new_status})
+        add_timeline(task, "status_updated", {"status": new_status}, at=now)
 
     if "commit_ids" in updates and isinstance(updates["commit_ids"], list):
         existing = set(task.get("commit_ids", []))
@@ -1518,7 +1575,9 @@ async def update_task(task_id: str, body: TaskUpdate):
     if task.get("status") == "completed":
         review_task = maybe_trigger_adversarial_review(task, data)
 
-    _refresh_parent_rollup(data)
+    # Parent roll-up only depends on task status and sub_tasks membership
+    if "status" in updates or "sub_tasks" in updates:
+        _refresh_parent_rollup(data)
     write_tasks(data)
 
     await broadcast_task_event(task, "task_updated")
@@ -1555,8 +1614,11 @@ async def delete_task(task_id: str):
     parent_id = task.get("parent_task_id")
     if parent_id:
         parent = find_task(data, parent_id)
-        if parent and task_id in (parent.get("sub_tasks") or []):
-            parent["sub_tasks"] = [s for s in parent["sub_tasks"] if s != task_id]
+        if parent and parent.get("sub_tasks"):
+            try:
+                parent["sub_tasks"].remove(task_id)  # ids are unique; stops at first match
+            except ValueError:
+                pass
 
     data["tasks"] = [t for t in data.get("tasks", []) if t.get("id") != task_id]
     event = emit_event(data, "task_deleted", task_id=task_id, message=f"Task {task_id} deleted")
@@ -1607,8 +1669,9 @@ async def dispatch_next(body: DispatchRequest):
             raise HTTPException(status_code=409, detail="Worker not idle")
 
         lease_id = f"lease-{uuid.uuid4().hex[:12]}"
+        now = _now()
         task["status"] = "in_progress"
-        task["started_at"] = task.get("started_at") or _now()
+        task["started_at"] = task.get("started_at") or now
         task["assigned_worker"] = worker["id"]
         _append_attempt(task, worker["id"], lease_id)
         add_timeline(task, "task_dispatched", {"worker_id": worker["id"], "lease_id": lease_id, "source": "dispatch_next"})
@@ -1616,8 +1679,8 @@ async def dispatch_next(body: DispatchRequest):
         worker["status"] = "busy"
         worker["current_task_id"] = task["id"]
         worker["lease_id"] = lease_id
-        worker["started_at"] = _now()
-        worker["last_seen_at"] = _now()
+        worker["started_at"] = now
+        worker["last_seen_at"] = now
 
         if worker["id"] not in RUNTIME_EXECUTIONS:
             RUNTIME_EXECUTIONS[worker["id"]] = asyncio.create_task(_run_worker_task(worker, task["id"]))
@@ -1746,7 +1809,7 @@ async def get_worker_logs(worker_id: str):
     worker = _worker_by_id(worker_id)
     if not worker:
         raise HTTPException(status_code=404, detail="Worker not found")
-    return {"worker_id": worker_id, "logs": WORKER_LOGS.get(worker_id, [])}
+    return {"worker_id": worker_id, "logs": list(WORKER_LOGS.get(worker_id, ()))}
 
 
 # --- Worker endpoints ---
@@ -1774,8 +1837,9 @@ async def update_worker(worker_id: str, body: WorkerUpdate):
     if body.current_task_id is not None:
         worker["current_task_id"] = body.current_task_id
 
-    worker["last_seen_at"] = _now()
-    worker["health"]["last_heartbeat"] = _now()
+    now = _now()
+    worker["last_seen_at"] = now
+    worker["health"]["last_heartbeat"] = now
     await ws_manager.broadcast({"type": "worker_updated", "worker": worker})
     return worker
 
@@ -1830,17 +1894,18 @@ async def claim_task(task_id: str, body: ClaimRequest):
         raise HTTPException(status_code=409, detail="Worker not claimable")
 
     lease_id = f"lease-{uuid.uuid4().hex[:12]}"
+    now = _now()
     task["status"] = "in_progress"
     task["assigned_worker"] = worker["id"]
-    task["started_at"] = task.get("started_at") or _now()
+    task["started_at"] = task.get("started_at") or now
     _append_attempt(task, worker["id"], lease_id)
 
     worker["status"] = "busy"
     worker["current_task_id"] = task_id
     worker["lease_id"] = lease_id
-    worker["started_at"] = _now()
-    worker["last_seen_at"] = _now()
-    worker["health"]["last_heartbeat"] = _now()
+    worker["started_at"] = now
+    worker["last_seen_at"] = now
+    worker["health"]["last_heartbeat"] = now
 
     add_timeline(task, "task_claimed", {"worker_id": worker["id"], "lease_id": lease_id})
     event = emit_event(data, "worker_claimed", task_id=task_id, worker_id=worker["id"], message="Task claimed")
@@ -1868,8 +1933,9 @@ async def heartbeat_task(task_id: str, body: HeartbeatRequest):
     if body.lease_id and worker.get("lease_id") and worker["lease_id"] != body.lease_id:
         raise HTTPException(status_code=409, detail="Lease mismatch")
 
-    worker["last_seen_at"] = _now()
-    worker["health"]["last_heartbeat"] = _now()
+    now = _now()
+    worker["last_seen_at"] = now
+    worker["health"]["last_heartbeat"] = now
     return {"ok": True, "worker_id": worker["id"], "task_id": task_id}
 
 
@@ -1879,7 +1945,7 @@ async def complete_task(task_id: str, body: CompleteRequest):
         task_id,
         worker_id=body.worker_id,
         lease_id=body.lease_id,
-        commit_ids=body.commit_ids,
+        commit_ids=list(body.commit_ids),
         summary=body.summary,
     )
     if not task:
@@ -1925,17 +1991,18 @@ async def dispatch_task(task_id: str):
         raise HTTPException(status_code=409, detail="No idle worker available")
 
     lease_id = f"lease-{uuid.uuid4().hex[:12]}"
+    now = _now()
     task["status"] = "in_progress"
     task["assigned_worker"] = worker["id"]
-    task["started_at"] = _now()
+    task["started_at"] = now
     _append_attempt(task, worker["id"], lease_id)
     add_timeline(task, "task_dispatched", {"worker_id": worker["id"], "lease_id": lease_id, "manual": True})
 
     worker["status"] = "busy"
     worker["current_task_id"] = task_id
     worker["lease_id"] = lease_id
-    worker["started_at"] = _now()
-    worker["last_seen_at"] = _now()
+    worker["started_at"] = now
+    worker["last_seen_at"] = now
 
     if worker["id"] not in RUNTIME_EXECUTIONS:
         RUNTIME_EXECUTIONS[worker["id"]] = asyncio.create_task(_run_worker_task(worker, task["id"]))
@@ -2003,8 +2070,9 @@ async def submit_review(task_id: str, body: ReviewResult):
     task["review_result"] = review_data
     task["review_status"] = "completed"
     task["status"] = "completed"
-    task["completed_at"] = _now()
-    add_timeline(task, "review_completed", {"summary": body.summary or ""})
+    now = _now()
+    task["completed_at"] = now
+    add_timeline(task, "review_completed", {"summary": body.summary or ""}, at=now)
 
     # Use shared review->fix->verify logic for parent task
     parent_id = task.get("parent_task_id")
@@ -2034,6 +2102,8 @@ async def _approve_plan_impl(task_id: str, body: PlanApproval, project_id: str |
     _validate_task_dor(task)
 
     if not body.approved:
+        # Re-planning the same task must run the CLI again, not replay the rejected plan
+        WORKER_RUNNER.forget_plan(task, _plan_cwd(project_id))
         task["status"] = "pending"
         if body.feedback:
             prev = task.get("plan_content") or ""
@@ -2055,6 +2125,7 @@ async def _approve_plan_impl(task_id: str, body: PlanApproval, project_id: str |
         task["plan_content"] = f"1. 实现 {task['title']}\n2. 编写测试\n3. 走代码审查"
 
     sub_inputs = _decompose_from_plan(task)
+    now = _now()
     created_subs = []
     for sub_input in sub_inputs:
         sub_id = gen_task_id(data)
@@ -2079,7 +2150,7 @@ async def _approve_plan_impl(task_id: str, body: PlanApproval, project_id: str |
             "review_status": None,
             "review_engine": None,
             "review_result": None,
-            "created_at": _now(),
+            "created_at": now,
             "started_at": None,
             "completed_at": None,
             "commit_ids": [],
@@ -2093,7 +2164,7 @@ async def _approve_plan_impl(task_id: str, body: PlanApproval, project_id: str |
             "review_round": 0,
             "last_exit_code": None,
         }
-        add_timeline(sub, "task_created", {"auto": True, "source": "plan_decompose"})
+        add_timeline(sub, "task_created", {"auto": True, "source": "plan_decompose"}, at=now)
         data["tasks"].insert(0, sub)
         task.setdefault("sub_tasks", []).append(sub_id)
         created_subs.append(sub)
@@ -2127,6 +2198,7 @@ async def _decompose_task_impl(task_id: str, body: DecomposeRequest, project_id:
     if not parent:
         raise HTTPException(status_code=404, detail="Task not found")
 
+    now = _now()
     created_subs = []
     for sub_input in body.sub_tasks:
         sub_id = gen_task_id(data)
@@ -2151,7 +2223,7 @@ async def _decompose_task_impl(task_id: str, body: DecomposeRequest, project_id:
             "review_status": None,
             "review_engine": None,
             "review_result": None,
-            "created_at": _now(),
+            "created_at": now,
             "started_at": None,
             "completed_at": None,
             "commit_ids": [],
@@ -2165,7 +2237,7 @@ async def _decompose_task_impl(task_id: str, body: DecomposeRequest, project_id:
             "review_round": 0,
             "last_exit_code": None,
         }
-        add_timeline(sub, "task_created", {"auto": False, "source": "manual_decompose"})
+        add_timeline(sub, "task_created", {"auto": False, "source": "manual_decompose"}, at=now)
         data["tasks"].insert(0, sub)
         parent.setdefault("sub_tasks", []).append(sub_id)
         created_subs.append(sub)
@@ -2398,17 +2470,16 @@ def _build_init_assistant_prompt(requirement: str) -> str:
 def _parse_init_assistant_json(text: str) -> dict | None:
     """Extract and validate init-assistant JSON from Claude CLI output.
 
-    Reuses the same regex pattern as _parse_review_json() — looks for the
+    Reuses _JSON_FENCE_RE from _parse_review_json() — looks for the
     last ```json ... ``` fenced block.
     Returns the parsed dict on success, None on any validation failure.
     """
-    pattern = r"```json\s*\n?(.*?)\n?\s*```"
-    matches = re.findall(pattern, text, re.DOTALL)
+    matches = _JSON_FENCE_RE.findall(text)
     if not matches:
         logger.warning("init-assistant output missing JSON block")
         return None
     try:
-        obj = json.loads(matches[-1])
+        obj = orjson.loads(matches[-1])
     except (json.JSONDecodeError, AttributeError) as exc:
         logger.warning("init-assistant JSON parse failed: %s", exc)
         return None
@@ -2456,12 +2527,11 @@ async def _call_claude_for_init_assistant(requirement: str) -> dict | None:
     Returns the parsed payload dict with source='claude_cli' on success,
     or None on any failure (triggers fallback to rule engine).
     """
+    # ENGINE_HEALTH["claude"] is the health loop's shutil.which probe of CLAUDE_CLI;
+    # a binary removed since the last tick surfaces as the OSError below
     if not ENGINE_HEALTH.get("claude", False):
         logger.info("init-assistant: Claude engine unhealthy, skipping CLI call")
         return None
-    if not shutil.which(CLAUDE_CLI):
-        logger.info("init-assistant: Claude CLI not found at %s", CLAUDE_CLI)
-        return None
 
     prompt = _build_init_assistant_prompt(requirement)
     cmd = [
@@ -2632,6 +2702,7 @@ async def create_project(body: ProjectCreate):
         raise HTTPException(status_code=409, detail=str(exc)) from exc
 
     pid = _gen_project_id(data)
+    now = _now()
 
     project = {
         "id": pid,
@@ -2640,8 +2711,8 @@ async def create_project(body: ProjectCreate):
         "repo_path": str(repo),
         "status": body.status,
         "init_brief": body.init_brief,
-        "created_at": _now(),
-        "updated_at": _now(),
+        "created_at": now,
+        "updated_at": now,
         "completed_at": None,
         "archived_at": None,
     }
@@ -2723,13 +2794,14 @@ async def update_project(project_id: str, body: ProjectUpdate):
     proj["description"] = next_desc
     proj["repo_path"] = str(Path(next_repo).resolve())
     proj["status"] = next_status
-    proj["updated_at"] = _now()
+    now = _now()
+    proj["updated_at"] = now
     if next_status == "completed" and not proj.get("completed_at"):
-        proj["completed_at"] = _now()
+        proj["completed_at"] = now
     if next_status != "completed":
         proj["completed_at"] = None
     if next_status == "archived" and not proj.get("archived_at"):
-        proj["archived_at"] = _now()
+        proj["archived_at"] = now
     if next_status != "archived":
         proj["archived_at"] = None
 
@@ -2811,9 +2883,9 @@ async def create_project_task(project_id: str, body: TaskCreate):
 
     # Validate depends_on references
     if body.depends_on:
-        for dep_id in body.depends_on:
-            if not find_task(data, dep_id):
-                raise HTTPException(status_code=400, detail=f"Dependency task not found: {dep_id}")
+        missing = _missing_dependencies(data, body.depends_on)
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Dependency task not found: {missing[0]}")
 
     task_id = gen_task_id(data)
 
@@ -2835,7 +2907,7 @@ async def create_project_task(project_id: str, body: TaskCreate):
         "depends_on": body.depends_on,
         "plan_mode": body.plan_mode,
         "plan_content": None,
-        "plan_questions": [q.model_dump() for q in body.plan_questions],
+        "plan_questions": PlanQuestionListAdapter.dump_python(body.plan_questions),
         "risk_level": body.risk_level,
         "sla_tier": body.sla_tier,
         "acceptance_criteria": body.acceptance_criteria,
@@ -2905,19 +2977,20 @@ async def update_project_task(project_id: str, task_id: str, body: TaskUpdate):
 
     if "status" in updates:
         new_status = updates["status"]
+        now = _now()
         if new_status == "in_progress":
             if not dependencies_satisfied(task, data):
                 raise HTTPException(status_code=409, detail="Dependencies not completed")
-            task["started_at"] = task.get("started_at") or _now()
+            task["started_at"] = task.get("started_at") or now
         elif new_status == "completed":
-            task["completed_at"] = _now()
+            task["completed_at"] = now
         elif new_status == "failed":
             task["retry_count"] = min(task.get("retry_count", 0) + 1, task.get("max_retries", 3))
         elif new_status == "pending" and task.get("status") == "failed":
             task["assigned_worker"] = None
             task["error_log"] = None
         task["status"] = new_status
-        add_timeline(task, "status_updated", {"status": new_status})
+        add_timeline(task, "status_updated", {"status": new_status}, at=now)
 
     if "commit_ids" in updates and isinstance(updates["commit_ids"], list):
         existing = set(task.get("commit_ids", []))
@@ -2938,7 +3011,9 @@ async def update_project_task(project_id: str, task_id: str, body: TaskUpdate):
     if task.get("status") == "completed":
         review_task = maybe_trigger_adversarial_review(task, data)
 
-    _refresh_parent_rollup(data)
+    # Parent roll-up only depends on task status and sub_tasks membership
+    if "status" in updates or "sub_tasks" in updates:
+        _refresh_parent_rollup(data)
     write_tasks(data, project_id)
 
     await broadcast_task_event(task, "task_updated", project_id=project_id)
@@ -2974,8 +3049,11 @@ async def delete_project_task(project_id: str, task_id: str):
     parent_id = task.get("parent_task_id")
     if parent_id:
         parent = find_task(data, parent_id)
-        if parent and task_id in (parent.get("sub_tasks") or []):
-            parent["sub_tasks"] = [s for s in parent["sub_tasks"] if s != task_id]
+        if parent and parent.get("sub_tasks"):
+            try:
+                parent["sub_tasks"].remove(task_id)  # ids are unique; stops at first match
+            except ValueError:
+                pass
 
     data["tasks"] = [t for t in data.get("tasks", []) if t.get("id") != task_id]
     emit_event(data, "task_deleted", task_id=task_id, message=f"Task {task_id} deleted")
@@ -3087,6 +3165,7 @@ async def project_dispatcher_queue(project_id: str):
     blocked: list[dict[str, Any]] = []
     retries: list[dict[str, Any]] = []
     fallback: list[dict[str, Any]] = []
+    idx = index_tasks(data)
     for task in data.get("tasks", []):
         st = task.get("status", "pending")
         summary[st] = summary.get(st, 0) + 1
@@ -3094,7 +3173,7 @@ async def project_dispatcher_queue(project_id: str):
             fallback.append({"task_id": task["id"], "fallback_reason": task.get("fallback_reason"), "routed_engine": task.get("routed_engine") or task.get("engine")})
         if task.get("status") == "failed" and task.get("retry_count", 0) < task.get("max_retries", 3):
             retries.append({"task_id": task["id"], "retry_count": task.get("retry_count", 0), "max_retries": task.get("max_retries", 3), "last_exit_code": task.get("last_exit_code")})
-        if st == "pending" and not dependencies_satisfied(task, data):
+        if st == "pending" and not dependencies_satisfied(task, data, idx):
             blocked.append({"task_id": task["id"], "reason": "dependencies_unmet", "depends_on": task.get("depends_on", [])})
         elif st in {"plan_review", "blocked_by_subtasks"}:
             blocked.append({"task_id": task["id"], "reason": task.get("blocked_reason") or st, "depends_on": task.get("depends_on", [])})
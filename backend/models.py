@@ -1,18 +1,24 @@
 """Agent Kanban - Pydantic request/response models."""
 from __future__ import annotations
 
+from enum import StrEnum
 from typing import Any, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 
 
-class PlanQuestion(BaseModel):
+class _DeferredModel(BaseModel):
+    # Build validators/serializers on first use instead of at import time.
+    model_config = ConfigDict(defer_build=True)
+
+
+class PlanQuestion(_DeferredModel):
     question: str
     options: list[str]
     selected: Optional[int] = None
 
 
-class ReviewIssue(BaseModel):
+class ReviewIssue(_DeferredModel):
     severity: str
     file: str
     line: int
@@ -20,12 +26,12 @@ class ReviewIssue(BaseModel):
     suggestion: str
 
 
-class ReviewResult(BaseModel):
+class ReviewResult(_DeferredModel):
     issues: list[ReviewIssue] = Field(default_factory=list)
     summary: Optional[str] = None
 
 
-class TaskCreate(BaseModel):
+class TaskCreate(_DeferredModel):
     title: str = Field(..., min_length=1, max_length=200)
     description: str = Field(default="", max_length=5000)
     engine: Literal["auto", "claude", "codex"] = "auto"
@@ -40,21 +46,56 @@ class TaskCreate(BaseModel):
     rollback_plan: Optional[str] = None
 
 
-class TaskUpdate(BaseModel):
-    status: Optional[Literal[
-        "pending", "in_progress", "plan_review", "blocked_by_subtasks",
-        "reviewing", "completed", "failed", "cancelled"
-    ]] = None
+class TaskStatus(StrEnum):
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    PLAN_REVIEW = "plan_review"
+    BLOCKED_BY_SUBTASKS = "blocked_by_subtasks"
+    REVIEWING = "reviewing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class TaskPriority(StrEnum):
+    HIGH = "high"
+    MEDIUM = "medium"
+    LOW = "low"
+
+
+class TaskEngine(StrEnum):
+    AUTO = "auto"
+    CLAUDE = "claude"
+    CODEX = "codex"
+
+
+class RiskLevel(StrEnum):
+    LOW = "low"
+    MEDIUM = "medium"
+    HIGH = "high"
+
+
+class SlaTier(StrEnum):
+    STANDARD = "standard"
+    EXPEDITE = "expedite"
+    URGENT = "urgent"
+
+
+class TaskUpdate(_DeferredModel):
+    # Enum fields validate via a hash lookup; store the plain string values in task rows
+    model_config = ConfigDict(defer_build=True, use_enum_values=True)
+
+    status: Optional[TaskStatus] = None
     title: Optional[str] = Field(default=None, max_length=200)
     description: Optional[str] = Field(default=None, max_length=5000)
-    priority: Optional[Literal["high", "medium", "low"]] = None
-    engine: Optional[Literal["auto", "claude", "codex"]] = None
+    priority: Optional[TaskPriority] = None
+    engine: Optional[TaskEngine] = None
     routed_engine: Optional[Literal["claude", "codex"]] = None
     plan_mode: Optional[bool] = None
     plan_content: Optional[str] = None
     plan_questions: Optional[list[PlanQuestion]] = None
-    risk_level: Optional[Literal["low", "medium", "high"]] = None
-    sla_tier: Optional[Literal["standard", "expedite", "urgent"]] = None
+    risk_level: Optional[RiskLevel] = None
+    sla_tier: Optional[SlaTier] = None
     acceptance_criteria: Optional[list[str]] = None
     rollback_plan: Optional[str] = None
     assigned_worker: Optional[str] = None
@@ -74,22 +115,22 @@ class TaskUpdate(BaseModel):
     last_exit_code: Optional[int] = None
 
 
-class DispatchRequest(BaseModel):
+class DispatchRequest(_DeferredModel):
     worker_id: Optional[str] = None
     engine: Optional[str] = Field(default=None, pattern="^(claude|codex)$")
     allow_plan_tasks: bool = False
 
 
-class EngineHealthUpdate(BaseModel):
+class EngineHealthUpdate(_DeferredModel):
     healthy: bool
 
 
-class PlanApproval(BaseModel):
+class PlanApproval(_DeferredModel):
     approved: bool
     feedback: Optional[str] = None
 
 
-class SubTaskInput(BaseModel):
+class SubTaskInput(_DeferredModel):
     title: str
     description: str = ""
     task_type: str = "feature"
@@ -97,44 +138,44 @@ class SubTaskInput(BaseModel):
     priority: str = "medium"
 
 
-class DecomposeRequest(BaseModel):
+class DecomposeRequest(_DeferredModel):
     sub_tasks: list[SubTaskInput]
 
 
-class WorkerUpdate(BaseModel):
+class WorkerUpdate(_DeferredModel):
     status: Optional[str] = None
     current_task_id: Optional[str] = None
 
 
-class ClaimRequest(BaseModel):
+class ClaimRequest(_DeferredModel):
     worker_id: str
 
 
-class HeartbeatRequest(BaseModel):
+class HeartbeatRequest(_DeferredModel):
     worker_id: str
     lease_id: Optional[str] = None
 
 
-class CompleteRequest(BaseModel):
+class CompleteRequest(_DeferredModel):
     worker_id: str
     lease_id: Optional[str] = None
-    commit_ids: list[str] = Field(default_factory=list)
+    commit_ids: tuple[str, ...] = ()
     summary: Optional[str] = None
 
 
-class FailRequest(BaseModel):
+class FailRequest(_DeferredModel):
     worker_id: str
     lease_id: Optional[str] = None
     error_log: str
     exit_code: Optional[int] = None
 
 
-class EventAckRequest(BaseModel):
+class EventAckRequest(_DeferredModel):
     by: Optional[str] = None
 
 
 # --- Project models ---
-class ProjectCreate(BaseModel):
+class ProjectCreate(_DeferredModel):
     name: str = Field(..., min_length=1, max_length=100)
     description: str = Field(default="", max_length=2000)
     repo_path: str = Field(..., min_length=1)
@@ -142,8 +183,13 @@ class ProjectCreate(BaseModel):
     init_brief: Optional[dict[str, Any]] = None
 
 
-class ProjectUpdate(BaseModel):
+class ProjectUpdate(_DeferredModel):
     name: Optional[str] = Field(default=None, max_length=100)
     description: Optional[str] = Field(default=None, max_length=2000)
     repo_path: Optional[str] = None
     status: Optional[Literal["draft", "active", "on_hold", "completed", "archived"]] = None
+
+
+# --- Shared list adapters (built once, reused per request) ---
+SubTaskListAdapter = TypeAdapter(list[SubTaskInput], config=ConfigDict(defer_build=True))
+PlanQuestionListAdapter = TypeAdapter(list[PlanQuestion], config=ConfigDict(defer_build=True))
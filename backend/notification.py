@@ -1,13 +1,17 @@
 """Web Push notification delivery via VAPID (pywebpush)."""
 from __future__ import annotations
 
+import asyncio
+import functools
 import json
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Optional
 
 from filelock import FileLock
+import orjson
 
 logger = logging.getLogger("agentkanban.notification")
 
@@ -22,15 +26,47 @@ VAPID_CLAIM_EMAIL: str = os.getenv("VAPID_CLAIM_EMAIL", "admin@agentkanban.local
 
 _push_enabled: bool = bool(VAPID_PRIVATE_KEY and VAPID_PUBLIC_KEY)
 
+# Max in-flight webpush() calls; each one blocks a thread for one HTTPS round-trip.
+# They get their own pool so a push burst never queues ahead of the default
+# executor's users (e.g. WorkerRunner waiting on CLI processes).
+_PUSH_CONCURRENCY = 8
+_PUSH_POOL = ThreadPoolExecutor(max_workers=_PUSH_CONCURRENCY, thread_name_prefix="webpush")
+
+
+# Parsed subscriptions keyed by (st_ino, st_mtime_ns, st_size) of the file they came from.
+# Every save swaps in a new inode via os.replace, so any write invalidates the entry.
+_subs_cache: tuple[tuple[int, int, int], list[dict]] | None = None
+
+
+def _read_subscriptions_file() -> list[dict]:
+    """Parse the subscriptions file. Caller must hold the subscriptions lock."""
+    global _subs_cache
+    try:
+        st = _SUBS_FILE.stat()
+    except FileNotFoundError:
+        return []
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    if _subs_cache is None or _subs_cache[0] != key:
+        raw = _SUBS_FILE.read_bytes()
+        _subs_cache = (key, orjson.loads(raw))
+    return list(_subs_cache[1])
+
+
+def _write_subscriptions_file(subs: list[dict]) -> None:
+    """Atomically replace the subscriptions file. Caller must hold the subscriptions lock."""
+    _DATA_DIR.mkdir(parents=True, exist_ok=True)
+    raw = orjson.dumps(subs, option=orjson.OPT_INDENT_2)
+    tmp = _SUBS_FILE.with_suffix(".tmp")
+    tmp.write_bytes(raw)
+    os.replace(tmp, _SUBS_FILE)
+
 
 def _load_subscriptions() -> list[dict]:
     lock = FileLock(str(_SUBS_LOCK))
     with lock:
-        if not _SUBS_FILE.exists():
-            return []
         try:
-            return json.loads(_SUBS_FILE.read_text(encoding="utf-8"))
-        except (json.JSONDecodeError, ValueError):
+            return _read_subscriptions_file()
+        except ValueError:  # orjson.JSONDecodeError subclasses ValueError
             logger.warning("Push subscriptions file corrupted, returning empty list")
             return []
 
@@ -38,11 +74,24 @@ def _load_subscriptions() -> list[dict]:
 def _save_subscriptions(subs: list[dict]) -> None:
     lock = FileLock(str(_SUBS_LOCK))
     with lock:
-        _DATA_DIR.mkdir(parents=True, exist_ok=True)
-        _SUBS_FILE.write_text(
-            json.dumps(subs, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+        _write_subscriptions_file(subs)
+
+
+def _drop_subscriptions(endpoints: set[str]) -> None:
+    """Remove the given endpoints in one locked read-modify-write."""
+    lock = FileLock(str(_SUBS_LOCK))
+    with lock:
+        try:
+            subs = _read_subscriptions_file()  # cache hit unless another writer got in first
+        except ValueError:
+            return
+        kept = [s for s in subs if s.get("endpoint") not in endpoints]
+        if len(kept) != len(subs):
+            _write_subscriptions_file(kept)
+
+
+def _subscriptions_by_endpoint() -> dict[str, dict]:
+    return {s.get("endpoint", ""): s for s in _load_subscriptions()}
 
 
 def add_subscription(subscription: dict) -> None:
@@ -50,17 +99,17 @@ def add_subscription(subscription: dict) -> None:
     endpoint = subscription.get("endpoint", "")
     if not endpoint:
         return
-    subs = _load_subscriptions()
-    subs = [s for s in subs if s.get("endpoint") != endpoint]
-    subs.append(subscription)
-    _save_subscriptions(subs)
+    subs = _subscriptions_by_endpoint()
+    subs.pop(endpoint, None)  # re-subscribing moves the entry to the end
+    subs[endpoint] = subscription
+    _save_subscriptions(list(subs.values()))
 
 
 def remove_subscription(endpoint: str) -> None:
     """Remove a subscription by endpoint (called on 410 Gone)."""
-    subs = _load_subscriptions()
-    subs = [s for s in subs if s.get("endpoint") != endpoint]
-    _save_subscriptions(subs)
+    subs = _subscriptions_by_endpoint()
+    if subs.pop(endpoint, None) is not None:
+        _save_subscriptions(list(subs.values()))
 
 
 def get_vapid_public_key() -> Optional[str]:
@@ -91,27 +140,33 @@ async def send_push_notification(
     vapid_claims = {"sub": f"mailto:{VAPID_CLAIM_EMAIL}"}
 
     subs = _load_subscriptions()
-    stale_endpoints: list[str] = []
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(_PUSH_CONCURRENCY)
 
-    for sub in subs:
+    async def _send(sub: dict) -> Optional[str]:
+        """Deliver to one subscription off the event loop; return its endpoint if expired."""
         endpoint = sub.get("endpoint", "")
-        try:
-            webpush(
-                subscription_info=sub,
-                data=payload,
-                vapid_private_key=VAPID_PRIVATE_KEY,
-                vapid_claims=vapid_claims,
-            )
-        except WebPushException as exc:
-            if getattr(exc, "response", None) is not None and exc.response.status_code == 410:
-                stale_endpoints.append(endpoint)
-                logger.info("Push subscription expired (410), removing: %s…", endpoint[:40])
-            else:
+        async with semaphore:
+            try:
+                await loop.run_in_executor(_PUSH_POOL, functools.partial(
+                    webpush,
+                    subscription_info=sub,
+                    data=payload,
+                    vapid_private_key=VAPID_PRIVATE_KEY,
+                    # webpush() fills in aud/exp per push service, so never share the dict
+                    vapid_claims=dict(vapid_claims),
+                ))
+            except WebPushException as exc:
+                if getattr(exc, "response", None) is not None and exc.response.status_code == 410:
+                    logger.info("Push subscription expired (410), removing: %s…", endpoint[:40])
+                    return endpoint
                 logger.warning("Push send failed for %s…: %s", endpoint[:40], exc)
-        except Exception:  # noqa: BLE001
-            logger.warning("Push send error for %s…", endpoint[:40], exc_info=True)
+            except Exception:  # noqa: BLE001
+                logger.warning("Push send error for %s…", endpoint[:40], exc_info=True)
+        return None
+
+    results = await asyncio.gather(*(_send(sub) for sub in subs))
+    stale_endpoints = {endpoint for endpoint in results if endpoint}
 
     if stale_endpoints:
-        updated = _load_subscriptions()
-        updated = [s for s in updated if s.get("endpoint") not in stale_endpoints]
-        _save_subscriptions(updated)
+        _drop_subscriptions(stale_endpoints)
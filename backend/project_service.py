@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import subprocess
+from collections import Counter
 from pathlib import Path
 
 
@@ -9,13 +10,25 @@ class ProjectValidationError(ValueError):
     """Raised when project payload or repo path is invalid."""
 
 
-ACTIVE_PROJECT_TASK_STATUSES = {
+ACTIVE_PROJECT_TASK_STATUSES = frozenset({
     "pending",
     "in_progress",
     "plan_review",
     "blocked_by_subtasks",
     "reviewing",
-}
+})
+
+# Allowed (current, next) project status transitions
+_ALLOWED_TRANSITIONS: frozenset[tuple[str, str]] = frozenset({
+    ("draft", "active"),
+    ("draft", "archived"),
+    ("active", "on_hold"),
+    ("active", "completed"),
+    ("active", "archived"),
+    ("on_hold", "active"),
+    ("on_hold", "archived"),
+    ("completed", "archived"),
+})
 
 
 def normalize_project_text(name: str, description: str, repo_path: str) -> tuple[str, str, str]:
@@ -40,21 +53,46 @@ def validate_git_repo(repo_path: str) -> Path:
     if not repo.is_dir():
         raise ProjectValidationError("repo_path must be a directory")
 
+    if _looks_like_git_worktree(repo):
+        return repo
+
     try:
-        result = subprocess.run(
-            ["git", "-C", str(repo), "rev-parse", "--git-dir"],
-            capture_output=True,
-            timeout=10,
-        )
+        is_repo = _git_rev_parse_ok(str(repo))
     except (subprocess.SubprocessError, OSError) as exc:
         raise ProjectValidationError(f"failed to validate git repository: {exc}") from exc
 
-    if result.returncode != 0:
+    if not is_repo:
         raise ProjectValidationError("repo_path is not a git repository")
 
     return repo
 
 
+def _looks_like_git_worktree(repo: Path) -> bool:
+    """Cheap stat-only check for the common `.git` dir / gitfile layouts."""
+    dot_git = repo / ".git"
+    if dot_git.is_dir():
+        return (dot_git / "HEAD").is_file()
+    if dot_git.is_file():
+        # linked worktrees and submodules use a "gitdir: <path>" pointer file
+        try:
+            with dot_git.open("rb") as fh:
+                return fh.read(8) == b"gitdir: "
+        except OSError:
+            return False
+    return False
+
+
+def _git_rev_parse_ok(repo: str) -> bool:
+    # Not cached: only reached for layouts the stat check above can't classify
+    # (subdirectories of a checkout, bare repos), whose verdict can change under us
+    result = subprocess.run(
+        ["git", "-C", repo, "rev-parse", "--git-dir"],
+        capture_output=True,
+        timeout=10,
+    )
+    return result.returncode == 0
+
+
 def ensure_project_unique(projects: list[dict], *, name: str, repo_path: str, ignore_project_id: str | None = None) -> None:
     name_key = name.strip().lower()
     repo_key = str(Path(repo_path).resolve())
@@ -73,23 +111,21 @@ def ensure_project_unique(projects: list[dict], *, name: str, repo_path: str, ig
 
 
 def summarize_project_tasks(tasks: list[dict]) -> dict[str, int]:
+    counts = Counter(task.get("status") or "pending" for task in tasks)
     summary = {
         "total": len(tasks),
-        "active": 0,
-        "pending": 0,
-        "in_progress": 0,
-        "plan_review": 0,
-        "blocked_by_subtasks": 0,
-        "reviewing": 0,
-        "completed": 0,
-        "failed": 0,
+        "active": sum(counts[status] for status in ACTIVE_PROJECT_TASK_STATUSES),
     }
-    for task in tasks:
-        status = task.get("status") or "pending"
-        if status in summary:
-            summary[status] += 1
-        if status in ACTIVE_PROJECT_TASK_STATUSES:
-            summary["active"] += 1
+    for status in (
+        "pending",
+        "in_progress",
+        "plan_review",
+        "blocked_by_subtasks",
+        "reviewing",
+        "completed",
+        "failed",
+    ):
+        summary[status] = counts[status]
     return summary
 
 
@@ -97,14 +133,7 @@ def ensure_project_can_transition(current_status: str, next_status: str, task_su
     if current_status == next_status:
         return
 
-    allowed: dict[str, set[str]] = {
-        "draft": {"active", "archived"},
-        "active": {"on_hold", "completed", "archived"},
-        "on_hold": {"active", "archived"},
-        "completed": {"archived"},
-        "archived": set(),
-    }
-    if next_status not in allowed.get(current_status, set()):
+    if (current_status, next_status) not in _ALLOWED_TRANSITIONS:
         raise ProjectValidationError(f"project status transition not allowed: {current_status} -> {next_status}")
 
     if next_status == "active" and task_summary.get("total", 0) == 0:
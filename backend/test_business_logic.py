@@ -7,26 +7,31 @@ Covers:
 - Bug 4: Manual retry resets retry_count (allows override after max retries)
 - Bug 5: depends_on validation rejects non-existent task IDs
 - Bug 6: Deleting tasks cleans up parent references
+- Rejecting a plan drops its cached AI plan
+
+PYTEST_DONT_REWRITE
 """
+import asyncio
 import json
-import sys
-from pathlib import Path
-from unittest.mock import patch
+from types import MappingProxyType
 
 import pytest
 
-# Ensure backend modules are importable
-sys.path.insert(0, str(Path(__file__).parent))
 
-from main import (
-    _release_worker,
-    _worker_by_id,
-    find_task,
-    gen_task_id,
-    maybe_trigger_adversarial_review,
-    WORKERS,
-    _ensure_task_shape,
-)
+# Scalar defaults only; mk_task() gives every task its own lists
+_TASK_TEMPLATE = {
+    "id": None,
+    "title": "",
+    "status": "pending",
+}
+
+
+def mk_task(**overrides) -> dict:
+    task = _TASK_TEMPLATE.copy()
+    task["sub_tasks"] = []
+    task["depends_on"] = []
+    task.update(overrides)
+    return task
 
 
 # ---------------------------------------------------------------------------
@@ -37,7 +42,7 @@ from main import (
 class TestDeleteInProgressTaskReleasesWorker:
     """When an in-progress task is deleted, its assigned worker must be freed."""
 
-    def test_release_worker_resets_state(self):
+    def test_release_worker_resets_state(self, main_mod):
         worker = {
             "id": "worker-0",
             "engine": "claude",
@@ -50,7 +55,7 @@ class TestDeleteInProgressTaskReleasesWorker:
             "health": {"last_heartbeat": "2025-01-01T00:00:00Z", "consecutive_failures": 0, "avg_task_duration_ms": 0},
         }
 
-        _release_worker(worker)
+        main_mod._release_worker(worker)
 
         assert worker["status"] == "idle"
         assert worker["current_task_id"] is None
@@ -60,41 +65,55 @@ class TestDeleteInProgressTaskReleasesWorker:
 
 
 # ---------------------------------------------------------------------------
-# Bug 2: Deleting a subtask cleans up parent's sub_tasks list
+# Bug 2 / Bug 6: Deleting a subtask cleans up parent's sub_tasks list
 # ---------------------------------------------------------------------------
 
 
+@pytest.fixture
+def parent_child_tree():
+    return {
+        "tasks": [
+            mk_task(id="task-001", title="Parent", status="blocked_by_subtasks", sub_tasks=["task-002", "task-003"]),
+            mk_task(id="task-002", title="Child 2", status="completed", parent_task_id="task-001"),
+            mk_task(id="task-003", title="Child 3", parent_task_id="task-001"),
+        ]
+    }
+
+
 class TestDeleteSubtaskCleansParent:
     """Deleting a subtask should remove it from the parent's sub_tasks list."""
 
-    def test_parent_subtasks_cleaned_on_child_delete(self):
-        parent = {
-            "id": "task-001",
-            "title": "Parent",
-            "status": "blocked_by_subtasks",
-            "sub_tasks": ["task-002", "task-003"],
-            "depends_on": [],
-        }
-        child = {
-            "id": "task-002",
-            "title": "Child",
-            "status": "pending",
-            "parent_task_id": "task-001",
-            "sub_tasks": [],
-            "depends_on": [],
-        }
-        data = {"tasks": [parent, child]}
+    @pytest.mark.parametrize(
+        "deleted_id,remaining",
+        [("task-002", ["task-003"]), ("task-003", ["task-002"])],
+        ids=["completed-child", "pending-child"],
+    )
+    @pytest.mark.parametrize("project_id", [None, "proj-1"], ids=["global", "project"])
+    def test_parent_subtasks_cleaned_on_child_delete(
+        self, main_mod, monkeypatch, parent_child_tree, deleted_id, remaining, project_id,
+    ):
+        data = parent_child_tree
+        parent = data["tasks"][0]
+        monkeypatch.setattr(main_mod, "read_tasks", lambda project_id=None: data)
+        monkeypatch.setattr(main_mod, "write_tasks", lambda d, project_id=None: None)
+
+        if project_id:
+            asyncio.run(main_mod.delete_project_task(project_id, deleted_id))
+        else:
+            asyncio.run(main_mod.delete_task(deleted_id))
+
+        assert parent["sub_tasks"] == remaining
+        assert deleted_id not in main_mod.index_tasks(data)
 
-        # Simulate the cleanup logic from delete_task
-        parent_id = child.get("parent_task_id")
-        assert parent_id == "task-001"
-        found_parent = find_task(data, parent_id)
-        assert found_parent is parent
-        if found_parent and child["id"] in (found_parent.get("sub_tasks") or []):
-            found_parent["sub_tasks"] = [s for s in found_parent["sub_tasks"] if s != child["id"]]
+    def test_child_missing_from_parent_subtasks_is_ignored(self, main_mod, monkeypatch, parent_child_tree):
+        data = parent_child_tree
+        data["tasks"][0]["sub_tasks"] = ["task-003"]
+        monkeypatch.setattr(main_mod, "read_tasks", lambda project_id=None: data)
+        monkeypatch.setattr(main_mod, "write_tasks", lambda d, project_id=None: None)
 
-        assert "task-002" not in parent["sub_tasks"]
-        assert "task-003" in parent["sub_tasks"]
+        asyncio.run(main_mod.delete_task("task-002"))
+
+        assert data["tasks"][0]["sub_tasks"] == ["task-003"]
 
 
 # ---------------------------------------------------------------------------
@@ -105,63 +124,44 @@ class TestDeleteSubtaskCleansParent:
 class TestAdversarialReviewTriggered:
     """Completing a feature/bugfix/refactor task should trigger adversarial review."""
 
-    def test_maybe_trigger_review_for_feature_task(self):
-        task = {
-            "id": "task-010",
-            "title": "Implement feature X",
-            "status": "completed",
-            "task_type": "feature",
-            "routed_engine": "claude",
-            "engine": "claude",
-            "review_round": 0,
-            "review_status": None,
-            "priority": "medium",
-        }
+    @pytest.mark.parametrize(
+        "task_type,has_open_review,expected_engine",
+        [
+            ("feature", False, "codex"),
+            ("bugfix", False, "codex"),
+            ("analysis", False, None),
+            ("bugfix", True, None),
+        ],
+        ids=["feature", "bugfix", "analysis-skipped", "no-duplicate-review"],
+    )
+    def test_maybe_trigger_review(self, main_mod, task_type, has_open_review, expected_engine):
+        task = mk_task(
+            id="task-010",
+            title="Implement feature X",
+            status="completed",
+            task_type=task_type,
+            routed_engine="claude",
+            engine="claude",
+            review_round=0,
+            review_status=None,
+            priority="medium",
+        )
         data = {"tasks": [task]}
+        if has_open_review:
+            data["tasks"].append(mk_task(id="task-011", parent_task_id="task-010", task_type="review"))
 
-        review_task = maybe_trigger_adversarial_review(task, data)
+        review_task = main_mod.maybe_trigger_adversarial_review(task, data)
 
-        assert review_task is not None
+        if expected_engine is None:
+            assert review_task is None
+            assert task["status"] == "completed"
+            return
         assert review_task["task_type"] == "review"
         assert review_task["parent_task_id"] == "task-010"
         # Cross-engine: claude task should be reviewed by codex
-        assert review_task["routed_engine"] == "codex"
+        assert review_task["routed_engine"] == expected_engine
         assert task["status"] == "reviewing"
 
-    def test_no_review_for_analysis_task(self):
-        task = {
-            "id": "task-020",
-            "title": "Analyze performance",
-            "status": "completed",
-            "task_type": "analysis",
-            "routed_engine": "codex",
-            "review_round": 0,
-        }
-        data = {"tasks": [task]}
-
-        review_task = maybe_trigger_adversarial_review(task, data)
-        assert review_task is None
-
-    def test_no_duplicate_review(self):
-        task = {
-            "id": "task-030",
-            "title": "Fix bug",
-            "status": "completed",
-            "task_type": "bugfix",
-            "routed_engine": "claude",
-            "review_round": 0,
-        }
-        existing_review = {
-            "id": "task-031",
-            "parent_task_id": "task-030",
-            "task_type": "review",
-            "status": "pending",
-        }
-        data = {"tasks": [task, existing_review]}
-
-        review_task = maybe_trigger_adversarial_review(task, data)
-        assert review_task is None
-
 
 # ---------------------------------------------------------------------------
 # Bug 4: Manual retry should reset retry_count
@@ -202,82 +202,61 @@ class TestManualRetryResetsCount:
 # ---------------------------------------------------------------------------
 
 
+# Read-only fixtures shared by the lookup-only tests below
+_DATA_SINGLE_TASK = MappingProxyType({
+    "tasks": (MappingProxyType({"id": "task-001", "title": "Exists"}),),
+})
+_EXISTING_IDS = frozenset({"task-001"})
+
+
 class TestDependsOnValidation:
     """Creating tasks with non-existent depends_on should be rejected."""
 
-    def test_find_task_returns_none_for_missing(self):
-        data = {
-            "tasks": [
-                {"id": "task-001", "title": "Exists"},
-            ]
-        }
+    def test_find_task_returns_none_for_missing(self, main_mod):
+        assert main_mod.find_task(_DATA_SINGLE_TASK, "task-001") is not None
+        assert main_mod.find_task(_DATA_SINGLE_TASK, "task-999") is None
 
-        assert find_task(data, "task-001") is not None
-        assert find_task(data, "task-999") is None
+    def test_index_matches_existing_ids(self, main_mod):
+        assert main_mod.index_tasks(_DATA_SINGLE_TASK).keys() == _EXISTING_IDS
 
-    def test_depends_on_with_existing_task_passes(self):
-        data = {
-            "tasks": [
-                {"id": "task-001", "title": "Exists"},
-            ]
-        }
-        depends_on = ["task-001"]
+    def test_depends_on_with_existing_task_passes(self, main_mod):
         # All deps exist — validation should pass
-        for dep_id in depends_on:
-            assert find_task(data, dep_id) is not None
-
-    def test_depends_on_with_missing_task_fails(self):
-        data = {
-            "tasks": [
-                {"id": "task-001", "title": "Exists"},
-            ]
-        }
-        depends_on = ["task-001", "task-999"]
+        assert main_mod._missing_dependencies(_DATA_SINGLE_TASK, ["task-001"]) == []
+
+    def test_depends_on_with_missing_task_fails(self, main_mod):
         # task-999 doesn't exist — validation should fail
-        missing = [dep_id for dep_id in depends_on if not find_task(data, dep_id)]
-        assert len(missing) == 1
-        assert missing[0] == "task-999"
+        missing = main_mod._missing_dependencies(_DATA_SINGLE_TASK, ["task-998", "task-001", "task-999"])
+        assert missing == ["task-998", "task-999"]
+
+    def test_dependencies_satisfied_with_index(self, main_mod):
+        data = {"tasks": [mk_task(id="task-001", status="completed"), mk_task(id="task-002", status="reviewing")]}
+        idx = main_mod.index_tasks(data)
+        assert main_mod.dependencies_satisfied(mk_task(depends_on=["task-001"]), data, idx)
+        assert not main_mod.dependencies_satisfied(mk_task(depends_on=["task-002"]), data, idx)
+        assert main_mod.dependencies_satisfied(mk_task(task_type="review", depends_on=["task-002"]), data, idx)
+        assert not main_mod.dependencies_satisfied(mk_task(depends_on=["task-999"]), data, idx)
 
 
 # ---------------------------------------------------------------------------
-# Bug 6: Orphaned sub-task cleanup on parent delete
+# Rejecting a plan must not replay it from the plan cache
 # ---------------------------------------------------------------------------
 
 
-class TestOrphanedSubTaskCleanup:
-    """Parent-child references should be consistent after deletion."""
+class TestPlanRejectionForgetsCachedPlan:
+    """A rejected plan is evicted so the next plan generation runs the CLI again."""
 
-    def test_child_refs_cleaned_when_parent_subtasks_list_updated(self):
-        parent = {
-            "id": "task-001",
-            "title": "Parent",
-            "status": "blocked_by_subtasks",
-            "sub_tasks": ["task-002", "task-003"],
-            "depends_on": [],
-        }
-        child2 = {
-            "id": "task-002",
-            "title": "Child 2",
-            "status": "completed",
-            "parent_task_id": "task-001",
-            "sub_tasks": [],
-            "depends_on": [],
-        }
-        child3 = {
-            "id": "task-003",
-            "title": "Child 3",
-            "status": "pending",
-            "parent_task_id": "task-001",
-            "sub_tasks": [],
-            "depends_on": [],
-        }
-        data = {"tasks": [parent, child2, child3]}
+    def test_reject_evicts_cached_plan(self, main_mod, monkeypatch):
+        task = mk_task(id="task-001", title="Add login", status="plan_review", description="OAuth")
+        data = {"tasks": [task], "events": []}
+        monkeypatch.setattr(main_mod, "read_tasks", lambda project_id=None: data)
+        monkeypatch.setattr(main_mod, "write_tasks", lambda d, project_id=None: None)
 
-        # Delete child3 — should be removed from parent's sub_tasks
-        task_to_delete = child3
-        parent_id = task_to_delete.get("parent_task_id")
-        found_parent = find_task(data, parent_id)
-        if found_parent and task_to_delete["id"] in (found_parent.get("sub_tasks") or []):
-            found_parent["sub_tasks"] = [s for s in found_parent["sub_tasks"] if s != task_to_delete["id"]]
+        runner = main_mod.WORKER_RUNNER
+        cwd = main_mod._plan_cwd(None)
+        key = runner._plan_cache_key(task, cwd)
+        runner._store_cached_plan(key, "1. rejected plan")
 
-        assert parent["sub_tasks"] == ["task-002"]
+        asyncio.run(main_mod._approve_plan_impl("task-001", main_mod.PlanApproval(approved=False, feedback="no")))
+
+        assert task["status"] == "pending"
+        assert runner._get_cached_plan(key) is None
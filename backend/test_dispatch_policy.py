@@ -1,10 +1,11 @@
-from __future__ import annotations
+"""Tests for dispatcher SLA ordering.
 
-from unittest import TestCase
+PYTEST_DONT_REWRITE
+"""
+from __future__ import annotations
 
 from backend.dispatcher import _sla_rank
 
 
-class DispatchPolicyTests(TestCase):
-    def test_sla_rank_prefers_urgent(self):
-        self.assertLess(_sla_rank({"sla_tier": "urgent"}), _sla_rank({"sla_tier": "standard"}))
+def test_sla_rank_prefers_urgent():
+    assert _sla_rank({"sla_tier": "urgent"}) < _sla_rank({"sla_tier": "standard"})
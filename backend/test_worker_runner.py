@@ -0,0 +1,106 @@
+"""Tests for WorkerRunner helpers.
+
+PYTEST_DONT_REWRITE
+"""
+from __future__ import annotations
+
+import asyncio
+import stat
+from types import SimpleNamespace
+
+from backend.worker_runner import WorkerRunner
+
+
+def test_extract_commit_ids_dedupes_in_order():
+    text = "commit abc1234\nMerged ABC1234 into deadbeefcafe\nsee abc1234 again"
+    assert WorkerRunner._extract_commit_ids(text) == ["abc1234", "deadbeefcafe"]
+
+
+def test_extract_commit_ids_ignores_short_and_embedded_hex():
+    assert WorkerRunner._extract_commit_ids("abc12 xabc1234 abc1234x") == []
+    assert WorkerRunner._extract_commit_ids("") == []
+
+
+def test_extract_commit_ids_caps_at_twenty():
+    text = " ".join(f"{i:07x}" for i in range(30))
+    ids = WorkerRunner._extract_commit_ids(text)
+    assert len(ids) == 20
+    assert ids[0] == "0000000"
+    assert ids[-1] == f"{19:07x}"
+
+
+def test_prompts_share_a_static_prefix_across_tasks():
+    a = {"id": "task-001", "title": "A", "description": "first", "task_type": "feature", "parent_task_id": "task-000"}
+    b = {"id": "task-777", "title": "B", "description": "second", "task_type": "bugfix", "parent_task_id": "task-700"}
+    for build in (WorkerRunner.build_prompt, WorkerRunner.build_review_prompt, WorkerRunner.build_plan_prompt):
+        pa, pb = build(a), build(b)
+        prefix_len = next(i for i, (x, y) in enumerate(zip(pa, pb)) if x != y)
+        assert "任务ID" in pa[:prefix_len]
+        assert "\\n" not in pa
+
+
+def test_extract_commit_ids_skips_overlong_hex_runs():
+    sha256 = "ab" * 32
+    assert WorkerRunner._extract_commit_ids(f"digest {sha256} commit abc1234") == ["abc1234"]
+
+
+def test_plan_cache_key_ignores_task_id_but_not_repo():
+    a = {"id": "task-001", "title": "Add login", "description": "OAuth", "task_type": "feature"}
+    b = dict(a, id="task-002")
+    key = WorkerRunner._plan_cache_key
+    assert key(a, "/repo") == key(b, "/repo")
+    assert key(a, "/repo") != key(a, "/other")
+    assert key(a, "/repo") != key(dict(a, description="SAML"), "/repo")
+
+
+def test_plan_cache_key_ignores_case_and_whitespace():
+    a = {"title": "Add login", "description": "Use OAuth\nfor SSO", "task_type": "feature"}
+    b = dict(a, title="  add   LOGIN ", description="use oauth for sso")
+    key = WorkerRunner._plan_cache_key
+    assert key(a, "/repo") == key(b, "/repo")
+    assert key(a, "/repo") != key(dict(a, title="Add logout"), "/repo")
+
+
+def test_plan_cache_expires(monkeypatch):
+    runner = WorkerRunner(claude_cli="claude", codex_cli="codex")
+    now = [1000.0]
+    # Swap the module's `time` reference only; patching time.monotonic itself is process-wide
+    monkeypatch.setattr("backend.worker_runner.time", SimpleNamespace(monotonic=lambda: now[0]))
+    runner._store_cached_plan(b"k", "1. plan")
+    assert runner._get_cached_plan(b"k") == "1. plan"
+    now[0] += 601
+    assert runner._get_cached_plan(b"k") is None
+
+
+def test_forget_plan_evicts_only_that_task():
+    runner = WorkerRunner(claude_cli="claude", codex_cli="codex")
+    a = {"title": "Add login", "description": "OAuth", "task_type": "feature"}
+    b = dict(a, title="Add logout")
+    runner._store_cached_plan(runner._plan_cache_key(a, "/repo"), "plan a")
+    runner._store_cached_plan(runner._plan_cache_key(b, "/repo"), "plan b")
+    runner.forget_plan(dict(a, id="task-002"), "/repo")
+    assert runner._get_cached_plan(runner._plan_cache_key(a, "/repo")) is None
+    assert runner._get_cached_plan(runner._plan_cache_key(b, "/repo")) == "plan b"
+
+
+def test_run_task_batches_log_lines(tmp_path):
+    cli = tmp_path / "fake-claude"
+    cli.write_text("#!/bin/sh\nprintf 'one\\n\\ntwo abc1234\\nthree\\n'\n")
+    cli.chmod(cli.stat().st_mode | stat.S_IEXEC)
+    runner = WorkerRunner(claude_cli=str(cli), codex_cli="codex")
+    chunks: list[str] = []
+    done: list[list[str]] = []
+
+    asyncio.run(runner.run_task(
+        worker={"id": "w1", "engine": "claude", "health": {}},
+        task={"id": "task-001", "title": "t"},
+        cwd=str(tmp_path),
+        on_complete=lambda ids, summary: done.append(ids),
+        on_fail=lambda err, rc: None,
+        on_release=lambda: None,
+        on_log=chunks.append,
+    ))
+
+    assert done == [["abc1234"]]
+    assert "\n".join(chunks).split("\n") == ["one", "", "two abc1234", "three"]
+    assert len(chunks) < 4
@@ -2,18 +2,102 @@
 from __future__ import annotations
 
 import asyncio
+import codecs
+import functools
+import hashlib
 import inspect
+import logging
 import os
 import re
-from datetime import datetime, timezone
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Awaitable, Callable, Optional
 
+logger = logging.getLogger("agentkanban.worker_runner")
+
+# Case-insensitive so callers never lowercase the whole stdout; matches are lowered individually.
+# The possessive quantifier stops a long hex run (blobs, digests) from backtracking through
+# every shorter length before the trailing \b fails.
+_COMMIT_RE = re.compile(r"\b[0-9a-f]{7,40}+\b", re.IGNORECASE)
+_MAX_COMMIT_IDS = 20
+
+# run_task only reports the last 1000 (summary) / 4000 (error) chars of stdout; keep enough
+# raw bytes for 4000 chars of 4-byte UTF-8 and drop the rest as it streams in
+_STDOUT_TAIL_BYTES = 16 * 1024
+
+# StreamReader buffer for CLI pipes. The 64 KiB default means more small reads and
+# fails outright on single stream-json lines longer than the limit.
+_STREAM_LIMIT = 1 << 20
+
+# Streamed log lines are handed to on_log in newline-joined batches at most this often
+_LOG_FLUSH_SEC = 0.016
+
+# fork/exec of the CLI runs here so a burst of spawns never stalls the event loop
+_SPAWN_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cli-spawn")
+
+# Successful plans are reused for identical (title, description, type, repo) within the TTL
+_PLAN_CACHE_TTL_SEC = 600
+_PLAN_CACHE_MAX_ENTRIES = 128
+
+# Static instruction blocks go first and never contain per-task text, so every spawn
+# shares a byte-identical prompt prefix that the model providers can cache.
+_TASK_PROMPT_HEADER = (
+    "你是 Agent Kanban 自动执行 Worker。\n"
+    "请在当前仓库工作目录中完成下面的任务。"
+    "完成后输出简要总结，并尽量输出 commit hash。\n\n"
+)
+
+_REVIEW_PROMPT_HEADER = (
+    "你是 Agent Kanban 的代码审查 Worker，执行对抗式 Code Review。\n"
+    "请仔细阅读当前仓库中的代码，从以下角度审查：\n"
+    "- 逻辑正确性和边界条件\n"
+    "- 安全漏洞（注入、越权等）\n"
+    "- 错误处理的完整性\n"
+    "- 性能问题\n"
+    "- 代码风格和可维护性\n\n"
+    "完成审查后，你必须在输出末尾附上如下 JSON 块（用 ```json 包裹）：\n"
+    "```json\n"
+    '{"issues": [\n'
+    '  {"severity": "critical|high|medium|low", "file": "路径", "line": 行号, '
+    '"description": "问题描述", "suggestion": "修复建议"}\n'
+    '], "summary": "一句话总结审查结论"}\n'
+    "```\n"
+    "severity 只能是 critical/high/medium/low 之一。\n"
+    "如果没有发现问题，issues 为空数组即可。\n\n"
+)
+
+_PLAN_PROMPT_HEADER = (
+    "你是 Agent Kanban 的计划生成助手，工作在只读模式下。\n"
+    "请探索当前代码仓库，理解下面任务的相关上下文，然后输出一个详细的有编号的实施计划。\n"
+    "要求:\n"
+    "- 每一步都以数字和点开头（如 '1. 做某事'）\n"
+    "- 步骤应具体可执行，聚焦代码改动\n"
+    "- 最多输出 8 个步骤\n"
+    "- 不要输出任何代码，只输出计划步骤\n"
+    "只输出计划内容，不要有任何前缀说明或附加内容。\n\n"
+)
+
 
 class WorkerRunner:
+    # Fixed CLI flags; only the prompt varies per spawn
+    _CLAUDE_FLAGS = ("--dangerously-skip-permissions", "--output-format", "stream-json", "--verbose")
+    _CODEX_FLAGS = ("--json", "--full-auto")
+    _PLAN_FLAGS = (
+        "--dangerously-skip-permissions",
+        "--allowedTools",
+        "Read,Glob,Grep",
+        "--output-format",
+        "text",
+    )
+
     def __init__(self, *, claude_cli: str, codex_cli: str, exec_mode: str = "real"):
         self.claude_cli = claude_cli
         self.codex_cli = codex_cli
         self.exec_mode = exec_mode.lower()
+        # Child env is computed once per runner instead of copying os.environ per spawn
+        self._env = self._clean_env()
+        self._plan_cache: dict[bytes, tuple[float, str]] = {}
 
     @staticmethod
     def _clean_env() -> dict[str, str]:
@@ -24,107 +108,108 @@ class WorkerRunner:
 
     @staticmethod
     def build_prompt(task: dict) -> str:
-        base = (
-            "你是 Agent Kanban 自动执行 Worker。\\n"
-            f"任务ID: {task['id']}\\n"
-            f"任务标题: {task['title']}\\n"
-            f"任务描述: {task.get('description', '')}\\n"
-            f"任务类型: {task.get('task_type')}\\n"
-            f"优先级: {task.get('priority')}\\n"
-            "请在当前仓库工作目录中完成此任务。"
-            "完成后输出简要总结，并尽量输出 commit hash。"
-        )
+        lines = [
+            _TASK_PROMPT_HEADER + f"任务ID: {task['id']}",
+            f"任务标题: {task['title']}",
+            f"任务描述: {task.get('description', '')}",
+            f"任务类型: {task.get('task_type')}",
+            f"优先级: {task.get('priority')}",
+        ]
         review_feedback = task.get("_review_feedback")
         if review_feedback:
-            base += (
-                "\n\n⚠️ 上一轮 Code Review 发现了以下问题，请优先修复：\n"
-                f"{review_feedback}\n"
-                "修复完成后提交代码。"
+            lines += (
+                "",
+                "⚠️ 上一轮 Code Review 发现了以下问题，请优先修复：",
+                str(review_feedback),
+                "修复完成后提交代码。",
             )
-        return base
+        return "\n".join(lines)
 
     def _build_cmd(self, engine: str, prompt: str) -> list[str]:
         if engine == "claude":
-            return [
-                self.claude_cli,
-                "-p",
-                prompt,
-                "--dangerously-skip-permissions",
-                "--output-format",
-                "stream-json",
-                "--verbose",
-            ]
-        return [self.codex_cli, "exec", prompt, "--json", "--full-auto"]
+            return [self.claude_cli, "-p", prompt, *self._CLAUDE_FLAGS]
+        return [self.codex_cli, "exec", prompt, *self._CODEX_FLAGS]
 
     @staticmethod
     def _extract_commit_ids(text: str) -> list[str]:
         if not text:
             return []
-        matches = re.findall(r"\b[0-9a-f]{7,40}\b", text.lower())
-        seen: set[str] = set()
-        out: list[str] = []
-        for item in matches:
-            if item not in seen:
-                seen.add(item)
-                out.append(item)
-        return out[:20]
+        seen: dict[str, None] = {}
+        WorkerRunner._collect_commit_ids(text, seen)
+        return list(seen)
+
+    @staticmethod
+    def _collect_commit_ids(text: str, seen: dict[str, None]) -> None:
+        """Add hashes found in text to seen (an insertion-ordered set), up to _MAX_COMMIT_IDS."""
+        for match in _COMMIT_RE.finditer(text):
+            seen.setdefault(match.group().lower(), None)
+            if len(seen) >= _MAX_COMMIT_IDS:
+                return
 
     @staticmethod
     def build_review_prompt(task: dict) -> str:
         """Build a structured-output prompt for adversarial code review."""
         parent_id = task.get("parent_task_id", "unknown")
         return (
-            "你是 Agent Kanban 的代码审查 Worker，执行对抗式 Code Review。\n"
-            f"任务ID: {task['id']}\n"
+            _REVIEW_PROMPT_HEADER
+            + f"任务ID: {task['id']}\n"
             f"审查目标: 任务 {parent_id} 的代码变更\n"
-            f"任务描述: {task.get('description', '')}\n\n"
-            "请仔细阅读当前仓库中的代码，从以下角度审查：\n"
-            "- 逻辑正确性和边界条件\n"
-            "- 安全漏洞（注入、越权等）\n"
-            "- 错误处理的完整性\n"
-            "- 性能问题\n"
-            "- 代码风格和可维护性\n\n"
-            "完成审查后，你必须在输出末尾附上如下 JSON 块（用 ```json 包裹）：\n"
-            "```json\n"
-            '{"issues": [\n'
-            '  {"severity": "critical|high|medium|low", "file": "路径", "line": 行号, '
-            '"description": "问题描述", "suggestion": "修复建议"}\n'
-            '], "summary": "一句话总结审查结论"}\n'
-            "```\n"
-            "severity 只能是 critical/high/medium/low 之一。\n"
-            "如果没有发现问题，issues 为空数组即可。"
+            f"任务描述: {task.get('description', '')}"
         )
 
     @staticmethod
     def build_plan_prompt(task: dict) -> str:
         """Build a read-only prompt for AI plan generation."""
         return (
-            "你是 Agent Kanban 的计划生成助手，工作在只读模式下。\n"
-            f"任务ID: {task['id']}\n"
+            _PLAN_PROMPT_HEADER
+            + f"任务ID: {task['id']}\n"
             f"任务标题: {task['title']}\n"
             f"任务描述: {task.get('description', '')}\n"
-            f"任务类型: {task.get('task_type')}\n\n"
-            "请探索当前代码仓库，理解相关上下文，然后输出一个详细的有编号的实施计划。\n"
-            "要求:\n"
-            "- 每一步都以数字和点开头（如 '1. 做某事'）\n"
-            "- 步骤应具体可执行，聚焦代码改动\n"
-            "- 最多输出 8 个步骤\n"
-            "- 不要输出任何代码，只输出计划步骤\n"
-            "只输出计划内容，不要有任何前缀说明或附加内容。"
+            f"任务类型: {task.get('task_type')}"
         )
 
+    @staticmethod
+    def _normalize_plan_text(text: str) -> str:
+        # Rephrasings that only differ in case or spacing should share a cached plan
+        return " ".join(text.split()).casefold()
+
+    @staticmethod
+    def _plan_cache_key(task: dict, cwd: str) -> bytes:
+        h = hashlib.blake2b(digest_size=16)
+        title = WorkerRunner._normalize_plan_text(task.get("title") or "")
+        description = WorkerRunner._normalize_plan_text(task.get("description") or "")
+        for part in (title, description, task.get("task_type") or "", cwd):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.digest()
+
+    def _get_cached_plan(self, key: bytes) -> Optional[str]:
+        entry = self._plan_cache.get(key)
+        if entry is None:
+            return None
+        stored_at, plan_text = entry
+        if time.monotonic() - stored_at > _PLAN_CACHE_TTL_SEC:
+            del self._plan_cache[key]
+            return None
+        return plan_text
+
+    def _store_cached_plan(self, key: bytes, plan_text: str) -> None:
+        self._plan_cache.pop(key, None)
+        while len(self._plan_cache) >= _PLAN_CACHE_MAX_ENTRIES:
+            del self._plan_cache[next(iter(self._plan_cache))]  # oldest insert first
+        self._plan_cache[key] = (time.monotonic(), plan_text)
+
+    def forget_plan(self, task: dict, cwd: str) -> None:
+        """Drop the cached plan for this task, e.g. after the user rejected it."""
+        self._plan_cache.pop(self._plan_cache_key(task, cwd), None)
+
+    def clear_plan_cache(self) -> None:
+        """Drop all cached plans, e.g. after new commits land in a repo."""
+        self._plan_cache.clear()
+
     def _build_plan_cmd(self, prompt: str) -> list[str]:
         """Build a restricted Claude CLI command for read-only plan generation."""
-        return [
-            self.claude_cli,
-            "-p",
-            prompt,
-            "--dangerously-skip-permissions",
-            "--allowedTools",
-            "Read,Glob,Grep",
-            "--output-format",
-            "text",
-        ]
+        return [self.claude_cli, "-p", prompt, *self._PLAN_FLAGS]
 
     async def run_plan_generation(
         self,
@@ -135,9 +220,6 @@ class WorkerRunner:
         on_fail: Callable[[str], Awaitable[None] | None],
     ) -> None:
         """Run Claude in read-only mode to generate a plan. Calls on_complete(plan_text) on success."""
-        import logging
-        logger = logging.getLogger("agentkanban.worker_runner")
-
         prompt = self.build_plan_prompt(task)
 
         if self.exec_mode == "dry-run":
@@ -153,33 +235,30 @@ class WorkerRunner:
             await self._maybe_await(on_complete(fake_plan))
             return
 
+        cache_key = self._plan_cache_key(task, cwd)
+        cached_plan = self._get_cached_plan(cache_key)
+        if cached_plan is not None:
+            logger.info("Plan generation cache hit for task %s", task.get("id"))
+            await self._maybe_await(on_complete(cached_plan))
+            return
+
         cmd = self._build_plan_cmd(prompt)
         logger.info("Plan generation starting: cmd=%s, cwd=%s", cmd[0], cwd)
-        stdout_lines: list[str] = []
+        stdout_buf = bytearray()
         try:
-            proc = await asyncio.create_subprocess_exec(
-                *cmd,
-                cwd=cwd,
-                env=self._clean_env(),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
+            proc, proc_stdout, proc_stderr = await self._spawn(cmd, cwd)
             logger.info("Plan generation process started, pid=%s", proc.pid)
-            if proc.stdout:
-                async for raw_line in proc.stdout:
-                    line = raw_line.decode("utf-8", errors="ignore").rstrip("\n\r")
-                    stdout_lines.append(line)
-
-            stderr_data = b""
-            if proc.stderr:
-                stderr_data = await proc.stderr.read()
+            # Nothing consumes plan output line by line; drain both pipes to EOF together
+            # so a chatty stderr can never fill up and block the child
+            stdout_data, stderr_data = await asyncio.gather(proc_stdout.read(), proc_stderr.read())
+            stdout_buf += stdout_data
 
-            await proc.wait()
-            rc = proc.returncode or 0
+            rc = await self._wait(proc)
 
-            plan_text = "\n".join(stdout_lines).strip()
+            plan_text = self._decode_output(stdout_buf).strip()
             logger.info("Plan generation finished: rc=%s, output_len=%d", rc, len(plan_text))
             if rc == 0 and plan_text:
+                self._store_cached_plan(cache_key, plan_text)
                 await self._maybe_await(on_complete(plan_text))
             else:
                 err = (stderr_data.decode("utf-8", errors="ignore") or plan_text or "plan generation failed")[-2000:]
@@ -189,6 +268,46 @@ class WorkerRunner:
             logger.error("Plan generation exception: %s", exc)
             await self._maybe_await(on_fail(f"Plan generation runtime error: {exc}"))
 
+    async def _spawn(
+        self, cmd: list[str], cwd: str,
+    ) -> tuple[subprocess.Popen, asyncio.StreamReader, asyncio.StreamReader]:
+        """Start cmd on the spawn pool and expose its stdout/stderr as asyncio streams."""
+        loop = asyncio.get_running_loop()
+        proc = await loop.run_in_executor(
+            _SPAWN_POOL,
+            functools.partial(
+                subprocess.Popen,
+                cmd,
+                cwd=cwd,
+                env=self._env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            ),
+        )
+        try:
+            stdout = await self._adopt_pipe(loop, proc.stdout)
+            stderr = await self._adopt_pipe(loop, proc.stderr)
+        except BaseException:
+            proc.kill()
+            raise
+        return proc, stdout, stderr
+
+    @staticmethod
+    async def _adopt_pipe(loop: asyncio.AbstractEventLoop, pipe) -> asyncio.StreamReader:
+        reader = asyncio.StreamReader(limit=_STREAM_LIMIT, loop=loop)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader, loop=loop), pipe)
+        return reader
+
+    @staticmethod
+    async def _wait(proc: subprocess.Popen) -> int:
+        # Callers drain both pipes first, so the process has exited or is about to
+        return await asyncio.to_thread(proc.wait) or 0
+
+    @staticmethod
+    def _decode_output(buf: bytes | bytearray) -> str:
+        """Decode captured stdout once, normalizing line endings like the per-line reader did."""
+        return buf.decode("utf-8", errors="ignore").replace("\r\n", "\n").rstrip("\r\n")
+
     @staticmethod
     async def _maybe_await(value):
         if inspect.isawaitable(value):
@@ -212,8 +331,9 @@ class WorkerRunner:
             prompt = self.build_prompt(task)
         cmd = self._build_cmd(worker["engine"], prompt)
 
-        started_at = datetime.now(timezone.utc)
-        stdout_lines: list[str] = []
+        started_ns = time.monotonic_ns()
+        stdout_tail = bytearray()
+        commit_ids: dict[str, None] = {}
         stderr = ""
         rc = 1
 
@@ -221,45 +341,56 @@ class WorkerRunner:
             if self.exec_mode == "dry-run":
                 await asyncio.sleep(0.2)
                 msg = "dry-run completed"
-                stdout_lines.append(msg)
+                stdout_tail += msg.encode("utf-8")
                 if on_log:
                     on_log(msg)
                 rc = 0
             else:
-                proc = await asyncio.create_subprocess_exec(
-                    *cmd,
-                    cwd=cwd,
-                    env=self._clean_env(),
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                )
+                proc, proc_stdout, proc_stderr = await self._spawn(cmd, cwd)
                 worker["pid"] = proc.pid
 
-                # Stream stdout line-by-line for real-time logging
-                async def _read_stderr():
-                    nonlocal stderr
-                    if proc.stderr:
-                        data = await proc.stderr.read()
-                        stderr = data.decode("utf-8", errors="ignore") if data else ""
+                loop = asyncio.get_running_loop()
+                log_batch: list[str] = []
+                flush_handle: asyncio.TimerHandle | None = None
 
-                stderr_task = asyncio.create_task(_read_stderr())
+                def _flush_logs() -> None:
+                    nonlocal flush_handle
+                    flush_handle = None
+                    if log_batch:
+                        on_log("\n".join(log_batch))
+                        log_batch.clear()
 
-                if proc.stdout:
-                    async for raw_line in proc.stdout:
-                        line = raw_line.decode("utf-8", errors="ignore").rstrip("\n\r")
-                        stdout_lines.append(line)
-                        if on_log:
-                            on_log(line)
+                # Stream stdout line-by-line for real-time logging
+                async def _drain_stdout() -> None:
+                    nonlocal stdout_tail, flush_handle
+                    # Commit ids are collected per line, so only a bounded tail of raw output is kept
+                    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+                    try:
+                        async for raw_line in proc_stdout:
+                            stdout_tail += raw_line
+                            if len(stdout_tail) > 2 * _STDOUT_TAIL_BYTES:
+                                del stdout_tail[:-_STDOUT_TAIL_BYTES]
+                            line = decoder.decode(raw_line).rstrip("\n\r")
+                            if len(commit_ids) < _MAX_COMMIT_IDS:
+                                self._collect_commit_ids(line, commit_ids)
+                            if on_log:
+                                log_batch.append(line)
+                                if flush_handle is None:
+                                    flush_handle = loop.call_later(_LOG_FLUSH_SEC, _flush_logs)
+                    finally:
+                        if flush_handle is not None:
+                            flush_handle.cancel()
+                        _flush_logs()
 
-                await stderr_task
-                await proc.wait()
-                rc = proc.returncode or 0
+                # Drain both pipes together so neither can back up and stall the child
+                _, stderr_data = await asyncio.gather(_drain_stdout(), proc_stderr.read())
+                stderr = stderr_data.decode("utf-8", errors="ignore") if stderr_data else ""
+                rc = await self._wait(proc)
 
-            stdout = "\n".join(stdout_lines)
+            stdout = self._decode_output(stdout_tail)
 
             if rc == 0:
-                commit_ids = self._extract_commit_ids(stdout)
-                await self._maybe_await(on_complete(commit_ids, stdout[-1000:] if stdout else None))
+                await self._maybe_await(on_complete(list(commit_ids), stdout[-1000:] if stdout else None))
             else:
                 err = (stderr or stdout or "worker execution failed")[-4000:]
                 await self._maybe_await(on_fail(err, rc))
@@ -267,10 +398,11 @@ class WorkerRunner:
             await self._maybe_await(on_fail(f"Worker runtime error: {exc}", 255))
         finally:
             worker["pid"] = None
-            duration_ms = int((datetime.now(timezone.utc) - started_at).total_seconds() * 1000)
-            avg = worker.get("health", {}).get("avg_task_duration_ms", 0)
-            if avg <= 0:
-                worker["health"]["avg_task_duration_ms"] = duration_ms
-            else:
-                worker["health"]["avg_task_duration_ms"] = int((avg * 0.8) + (duration_ms * 0.2))
+            duration_ms = (time.monotonic_ns() - started_ns) // 1_000_000
+            # EWMA is kept as a float so int truncation doesn't bias it downwards over time
+            health = worker.setdefault("health", {})
+            avg = health.get("avg_task_duration_ms_f", health.get("avg_task_duration_ms", 0))
+            avg = duration_ms if avg <= 0 else avg * 0.8 + duration_ms * 0.2
+            health["avg_task_duration_ms_f"] = avg
+            health["avg_task_duration_ms"] = int(avg)
             await self._maybe_await(on_release())